@@ -1,8 +1,65 @@
 import os
 import streamlit as st
 from core.subtitle_extractor import VideoSubtitleExtractor
-from utils import SUPPORTED_LANGUAGES, check_gpu_availability
+from core.model_registry import ModelRegistry
+from core.checkpoint import checkpoint_path_for
+from core.result_cache import ResultCache
+from core.ocr_store import resegment_ocr_results
+from core.cues import CueList
+from core.writers import WRITERS, open_writers
+from utils import SUPPORTED_LANGUAGES, VIDEO_EXTENSIONS, check_gpu_availability
+import json
 import time
+import urllib.request
+
+# Extraction runs in the job service (python -m service) when set, e.g. http://127.0.0.1:8765
+SERVICE_URL = os.environ.get('SUBTITLE_SERVICE_URL')
+
+@st.cache_resource
+def get_model_registry() -> ModelRegistry:
+    """OCR models shared by every session and rerun of the app"""
+    return ModelRegistry(
+        max_entries=int(os.environ.get('OCR_MODEL_CACHE_SIZE', 4)),
+        max_memory_mb=float(os.environ['OCR_MODEL_CACHE_MB']) if 'OCR_MODEL_CACHE_MB' in os.environ else None
+    )
+
+@st.cache_resource
+def get_result_cache() -> ResultCache:
+    """Subtitles of videos already processed, shared by every session"""
+    return ResultCache(max_size_mb=float(os.environ.get('SUBTITLE_CACHE_MB', 256)))
+
+def service_request(method: str, path: str, payload=None) -> dict:
+    """Call the extraction job service and return its JSON response"""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(f"{SERVICE_URL.rstrip('/')}{path}", data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.load(response)
+
+def extract_with_service(video_name: str, lang_code, frame_rate: int, confidence_threshold: float,
+                         subtitle_disappear_threshold: int, progress_bar, live_status) -> CueList:
+    """
+    Run the extraction as a service job and wait for it
+
+    The job keeps running if the page is closed, and submitting the same video
+    and settings again picks the running job up instead of starting over.
+    """
+    job = service_request('POST', '/jobs', {
+        'video': video_name,
+        'lang': lang_code,
+        'frame_rate': frame_rate,
+        'confidence_threshold': confidence_threshold,
+        'subtitle_disappear_threshold': subtitle_disappear_threshold,
+    })
+    while job['status'] in ('queued', 'running'):
+        progress_bar.progress(job['progress'])
+        live_status.text("Waiting for a free worker..." if job['status'] == 'queued' else f"Extracting... {job['progress']}%")
+        time.sleep(1.0)
+        job = service_request('GET', f"/jobs/{job['id']}")
+    if job['status'] != 'done':
+        raise RuntimeError(job['error'] or f"Job {job['status']}")
+    progress_bar.progress(100)
+    return CueList(service_request('GET', f"/jobs/{job['id']}/subtitles")['subtitles'])
 
 def main():
     st.title("🎬 Video Hardcoded Subtitle Extractor")
@@ -22,6 +79,8 @@ def main():
         st.session_state.subtitles = None
     if 'video_path' not in st.session_state:
         st.session_state.video_path = ''
+    if 'raw_results' not in st.session_state:
+        st.session_state.raw_results = None
 
     # Sidebar configuration
     st.sidebar.header("Extraction Settings")
@@ -41,6 +100,26 @@ def main():
         help="Lower values include more potential subtitles, higher values are more selective"
     )
 
+    subtitle_disappear_threshold = st.sidebar.slider(
+        "Subtitle Disappear Threshold",
+        min_value=1,
+        max_value=30,
+        value=10,
+        help="Number of processed frames without text after which a subtitle ends"
+    )
+
+    keep_raw_results = st.sidebar.checkbox(
+        "Keep raw OCR results",
+        value=False,
+        help="Save per-frame OCR results next to the video so threshold changes apply instantly, without re-running OCR"
+    )
+
+    resume = st.sidebar.checkbox(
+        "Resume interrupted extraction",
+        value=True,
+        help="Periodically save progress next to the output file and continue from it after a failure"
+    )
+
     # Language selection
     languages =  {v: k for k, v in SUPPORTED_LANGUAGES.items()}
     selected_lang = st.sidebar.selectbox(
@@ -50,11 +129,21 @@ def main():
         help="Select the language of subtitles in the video"
     )
     
+    # Optional second language for bilingual subtitles, both share one detection pass
+    second_lang = st.sidebar.selectbox(
+        "Second Language (bilingual)",
+        options=["None"] + [name for name in languages if name != selected_lang],
+        index=0,
+        help="Language of the second subtitle line, below the first one"
+    )
+
     # Get language code
     lang_code = languages[selected_lang]
+    if second_lang != "None":
+        lang_code = [lang_code, languages[second_lang]]
 
     # List available videos in the input directory
-    available_videos = [f for f in os.listdir(VIDEO_INPUT_DIR) if f.lower().endswith(('.mp4', '.avi', '.mov'))]
+    available_videos = [f for f in os.listdir(VIDEO_INPUT_DIR) if f.lower().endswith(VIDEO_EXTENSIONS)]
     
     # Video selection dropdown
     selected_video = st.selectbox(
@@ -81,40 +170,40 @@ def main():
             st.warning(f"The specified path '{video_path}' is not a valid file.")
             return
         
-        # Create extractor with specified max concurrent frames
-        extractor = VideoSubtitleExtractor(lang=lang_code, use_gpu=is_gpu_available)
-
-        # Get video metadata
-        metadata = extractor.get_video_metadata(video_path)
-        
-        # Display video metadata
-        if metadata:
-            st.sidebar.subheader("Video Details")
-            col1, col2 = st.sidebar.columns(2)
-            with col1:
-                st.sidebar.metric("Duration", f"{metadata['duration']:.2f} sec")
-                st.sidebar.metric("FPS", f"{metadata['fps']:.2f}")
-            with col2:
-                st.sidebar.metric("Resolution", f"{metadata['width']}x{metadata['height']}")
-
         # Start timer
         start_time = time.time()
 
         # Create a progress bar
         progress_bar = st.progress(0)
+        live_status = st.empty()
+
+        if SERVICE_URL:
+            with st.spinner(f'Extracting subtitles from {os.path.basename(video_path)}...'):
+                try:
+                    subtitles = extract_with_service(
+                        os.path.relpath(video_path, VIDEO_INPUT_DIR), lang_code, frame_rate,
+                        confidence_threshold, subtitle_disappear_threshold, progress_bar, live_status
+                    )
+                except Exception as e:
+                    st.error(f"Extraction service failed: {e}")
+                    return
+            live_status.empty()
+            keep_raw_results = False  # Raw OCR results are not sent back by the service
+        else:
+            subtitles = extract_locally(video_path, VIDEO_INPUT_DIR, lang_code, is_gpu_available,
+                                        frame_rate, confidence_threshold, subtitle_disappear_threshold,
+                                        keep_raw_results, resume, progress_bar, live_status)
 
-        # Extract subtitles
-        with st.spinner(f'Extracting subtitles from {os.path.basename(video_path)}...'):
-            subtitles = extractor.extract_subtitles(
-                video_path, 
-                frame_rate=frame_rate,
-                confidence_threshold=confidence_threshold,
-                progress_bar=progress_bar  # Pass the progress bar
-            )
+        raw_results_path = raw_results_path_for(video_path, VIDEO_INPUT_DIR) if keep_raw_results else None
 
         # Store subtitles and video path in session state
         st.session_state.subtitles = subtitles
         st.session_state.video_path = video_path
+        st.session_state.raw_results = {
+            'path': raw_results_path,
+            'source': (video_path, frame_rate, str(lang_code)),
+            'thresholds': (confidence_threshold, subtitle_disappear_threshold),
+        } if raw_results_path else None
 
         # End timer
         end_time = time.time()
@@ -124,7 +213,70 @@ def main():
         st.sidebar.subheader("Processing Time")
         st.sidebar.text(f"Time taken: {processing_time:.2f} seconds")
 
+    # Threshold changes on the same video are applied to the saved raw OCR results
+    raw_results = st.session_state.raw_results
+    thresholds = (confidence_threshold, subtitle_disappear_threshold)
+    if (not process_button and raw_results and raw_results['thresholds'] != thresholds
+            and raw_results['source'] == (video_path, frame_rate, str(lang_code))
+            and os.path.isfile(raw_results['path'])):
+        st.session_state.subtitles = resegment_ocr_results(raw_results['path'], *thresholds)
+        raw_results['thresholds'] = thresholds
+        st.sidebar.info("Subtitles rebuilt from saved OCR results")
+
     # Check if subtitles exist in session state
+    show_subtitles(VIDEO_INPUT_DIR)
+
+def output_path_for(video_path: str, video_dir: str) -> str:
+    return os.path.join(video_dir, f"{os.path.splitext(os.path.basename(video_path))[0]}.srt")
+
+def raw_results_path_for(video_path: str, video_dir: str) -> str:
+    return f"{os.path.splitext(output_path_for(video_path, video_dir))[0]}.ocr.npz"
+
+def extract_locally(video_path, video_dir, lang_code, is_gpu_available, frame_rate, confidence_threshold,
+                    subtitle_disappear_threshold, keep_raw_results, resume, progress_bar, live_status) -> CueList:
+    """Run the extraction in the app process, showing each subtitle as soon as it is finalized"""
+    # Create extractor, models are loaded once and reused between clicks
+    extractor = VideoSubtitleExtractor(lang=lang_code, use_gpu=is_gpu_available,
+                                       registry=get_model_registry(),
+                                       result_cache=get_result_cache())
+
+    # Get video metadata
+    metadata = extractor.get_video_metadata(video_path)
+    
+    # Display video metadata
+    if metadata:
+        st.sidebar.subheader("Video Details")
+        col1, col2 = st.sidebar.columns(2)
+        with col1:
+            st.sidebar.metric("Duration", f"{metadata['duration']:.2f} sec")
+            st.sidebar.metric("FPS", f"{metadata['fps']:.2f}")
+        with col2:
+            st.sidebar.metric("Resolution", f"{metadata['width']}x{metadata['height']}")
+
+    # Progress is checkpointed next to the subtitle file the video is saved to
+    output_path = output_path_for(video_path, video_dir)
+    raw_results_path = raw_results_path_for(video_path, video_dir) if keep_raw_results else None
+
+    subtitles = CueList()
+    with st.spinner(f'Extracting subtitles from {os.path.basename(video_path)}...'):
+        for subtitle in extractor.iter_subtitles(
+            video_path, 
+            frame_rate=frame_rate,
+            confidence_threshold=confidence_threshold,
+            subtitle_disappear_threshold=subtitle_disappear_threshold,
+            progress_bar=progress_bar,  # Pass the progress bar
+            checkpoint_path=checkpoint_path_for(output_path),
+            resume=resume,
+            raw_results_path=raw_results_path
+        ):
+            subtitles.append(subtitle)
+            live_status.text(f"{len(subtitles)} subtitles found, latest at {subtitle['start_time']}: "
+                             f"{subtitle['text'].splitlines()[0]}")
+    live_status.empty()
+    return subtitles
+
+def show_subtitles(video_dir: str) -> None:
+    """Preview the subtitles of the session and offer to save them"""
     if st.session_state.subtitles:
         # Display results
         if len(st.session_state.subtitles) > 10:
@@ -142,25 +294,23 @@ def main():
                 st.text(line)
             st.text("---")
         
-        srt_content = ""
-        for i, subtitle in enumerate(st.session_state.subtitles, 1):
-            # Keep newlines for SRT format
-            srt_content += f"{i}\n{subtitle['start_time']} --> {subtitle['end_time']}\n{subtitle['text']}\n\n"
-        
+        formats = st.multiselect("Formats", list(WRITERS), default=['srt'])
+
         # Save button
-        save_button = st.button("💾 Save Subtitles")
+        save_button = st.button("💾 Save Subtitles", disabled=not formats)
         
         if save_button:
-            # Generate output filename
-            output_filename = f"{os.path.splitext(os.path.basename(st.session_state.video_path))[0]}.srt"
-            output_path = os.path.join(VIDEO_INPUT_DIR, output_filename)
+            # Generate output filenames
+            base_path = os.path.splitext(output_path_for(st.session_state.video_path, video_dir))[0]
             
-            # Save to file in mounted directory
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(srt_content)
+            # Save to files in mounted directory
+            for writer in open_writers(base_path, formats):
+                with writer:
+                    for subtitle in st.session_state.subtitles:
+                        writer.write(subtitle)
             
             # Show success message
-            st.success(f"Subtitles saved to {output_path}")
+            st.success(f"Subtitles saved to {base_path} ({', '.join(formats)})")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
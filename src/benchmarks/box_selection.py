@@ -0,0 +1,81 @@
+"""
+Micro-benchmark of the box filtering and ordering done on every OCR'd frame
+
+Compares utils.select_subtitle_boxes with the per-box Python implementation it
+replaced (sort by centers, filter, then sort by first point) on random detector
+output, and checks both keep the same boxes in the same order.
+
+Usage (from src):
+    python -m benchmarks.box_selection --boxes 2 10 100 500
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utils import select_subtitle_boxes
+
+def _legacy_select(dt_boxes, img_height, img_width):
+    boxes = sorted(dt_boxes, key=lambda x: (np.mean(x[:, 1]), np.mean(x[:, 0])))
+    kept = []
+    for box in boxes:
+        box_height = max(box[:, 1]) - min(box[:, 1])
+        box_width = max(box[:, 0]) - min(box[:, 0])
+        box_center_y = np.mean(box[:, 1])
+        if (box_center_y > img_height * 0.6
+                and img_width * 0.1 < box_width < img_width * 0.8
+                and box_height < img_height * 0.15):
+            kept.append(box)
+    kept.sort(key=lambda x: x[0][1])
+    return kept
+
+def random_boxes(count, img_height, img_width, rng):
+    """
+    Axis-aligned (count, 4, 2) boxes in detector point order, with a little jitter
+    """
+    left = rng.uniform(0, img_width * 0.9, count)
+    top = rng.uniform(0, img_height * 0.95, count)
+    width = rng.uniform(img_width * 0.02, img_width * 0.6, count)
+    height = rng.uniform(img_height * 0.02, img_height * 0.08, count)
+    boxes = np.stack([
+        np.stack([left, top], axis=1),
+        np.stack([left + width, top], axis=1),
+        np.stack([left + width, top + height], axis=1),
+        np.stack([left, top + height], axis=1),
+    ], axis=1)
+    return (boxes + rng.normal(0, 0.5, boxes.shape)).astype(np.float32)
+
+def _best_time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--boxes', type=int, nargs='+', default=[2, 10, 100, 500],
+                        help='Numbers of boxes per frame to time')
+    parser.add_argument('--repeat', type=int, default=200, help='Runs per measurement, the best one is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    img_height, img_width = 1080, 1920
+    rng = np.random.default_rng(args.seed)
+    print(f"{'boxes':>6} {'legacy us':>10} {'vectorized us':>14} {'speedup':>8}")
+    for count in args.boxes:
+        dt_boxes = random_boxes(count, img_height, img_width, rng)
+
+        expected = _legacy_select(list(dt_boxes), img_height, img_width)
+        indices = select_subtitle_boxes(dt_boxes, img_height, img_width)
+        assert len(expected) == len(indices) and all(
+            np.array_equal(a, dt_boxes[i]) for a, i in zip(expected, indices)
+        ), f"selection differs for {count} boxes"
+
+        legacy = _best_time(lambda: _legacy_select(list(dt_boxes), img_height, img_width), args.repeat)
+        vectorized = _best_time(lambda: select_subtitle_boxes(dt_boxes, img_height, img_width), args.repeat)
+        print(f"{count:>6} {legacy * 1e6:>10.1f} {vectorized * 1e6:>14.1f} {legacy / vectorized:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
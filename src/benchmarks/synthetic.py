@@ -0,0 +1,298 @@
+"""
+Speed and accuracy benchmark on synthetic videos with burned-in subtitles
+
+Renders videos with known subtitle text and timings over varied backgrounds
+and resolutions, runs extract_subtitles on them in several modes and reports,
+per video and mode: processed video frames per second, OCR detector calls,
+peak RSS (null on Windows), mean start/end timing error and character accuracy. Every mode runs
+in its own process, so peak RSS and loaded models are measured separately.
+
+Usage (from src):
+    python -m benchmarks.synthetic --output results.json
+    python -m benchmarks.synthetic --modes default batch --baseline results.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from core.cues import CueList
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# iter_subtitles options of each benchmarked mode
+MODES: Dict[str, Dict] = {
+    'no_gate_grab': {'sampling': 'grab', 'skip_unchanged': False},
+    'default': {},
+    'seek': {'sampling': 'seek'},
+    'adaptive': {'sampling': 'adaptive'},
+    'batch': {'batch_size': 8},
+    'pipeline': {'pipeline': True, 'ocr_workers': 2},
+    'parallel': {'workers': 2},
+    'calibrated': {'calibrate_roi': True},
+}
+
+# Videos generated by default: (width, height, background)
+DEFAULT_VIDEOS = [
+    (1280, 720, 'gradient'),
+    (1920, 1080, 'noise'),
+    (854, 480, 'moving'),
+]
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog we never said that you should come home "
+    "tonight after dinner where were you yesterday morning I think it will rain soon "
+    "please tell me everything about the plan before they arrive"
+).split()
+
+def make_cues(duration: float, rng: random.Random, min_length: float = 1.5,
+              max_length: float = 4.0, max_gap: float = 1.5) -> List[Dict]:
+    """
+    Random subtitle cues with times in seconds, one or two lines each
+    """
+    cues, t = [], rng.uniform(0.5, 1.5)
+    while True:
+        length = rng.uniform(min_length, max_length)
+        if t + length > duration - 0.5:
+            return cues
+        lines = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 7)))
+                 for _ in range(rng.choice((1, 1, 2)))]
+        cues.append({'start': t, 'end': t + length, 'text': "\n".join(lines).capitalize()})
+        t += length + rng.uniform(0.2, max_gap)
+
+def _background(kind: str, index: int, width: int, height: int, rng: np.random.Generator,
+                base: np.ndarray) -> np.ndarray:
+    if kind == 'noise':
+        return rng.integers(0, 160, (height, width, 3), dtype=np.uint8)
+    if kind == 'moving':
+        return np.roll(base, index * 4, axis=1)
+    return base
+
+def _draw_subtitle(frame: np.ndarray, text: str) -> None:
+    """
+    White text with a black outline, centered near the bottom like usual burned-in subtitles
+    """
+    height, width = frame.shape[:2]
+    scale = height / 720 * 1.1
+    thickness = max(1, int(round(scale * 2)))
+    lines = text.split("\n")
+    line_height = int(40 * scale)
+    y = int(height * 0.92) - line_height * (len(lines) - 1)
+    for line in lines:
+        (text_width, _), _ = cv2.getTextSize(line, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        origin = ((width - text_width) // 2, y)
+        cv2.putText(frame, line, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), thickness * 4, cv2.LINE_AA)
+        cv2.putText(frame, line, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255), thickness, cv2.LINE_AA)
+        y += line_height
+
+def generate_video(path: str, cues: List[Dict], width: int, height: int, fps: float = 25.0,
+                   duration: float = 30.0, background: str = 'gradient', seed: int = 0) -> None:
+    """
+    Render a video showing each cue between its start and end time
+    """
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(30, 200, width, dtype=np.float32)
+    base = np.dstack([
+        np.tile(gradient, (height, 1)),
+        np.tile(gradient[::-1], (height, 1)),
+        np.full((height, width), 90, np.float32),
+    ]).astype(np.uint8)
+    if background == 'moving':
+        base = cv2.GaussianBlur(rng.integers(0, 200, (height, width, 3), dtype=np.uint8), (0, 0), 8)
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    try:
+        for index in range(int(duration * fps)):
+            t = index / fps
+            frame = _background(background, index, width, height, rng, base).copy()
+            for cue in cues:
+                if cue['start'] <= t < cue['end']:
+                    _draw_subtitle(frame, cue['text'])
+                    break
+            writer.write(frame)
+    finally:
+        writer.release()
+
+def levenshtein(first: str, second: str) -> int:
+    previous = list(range(len(second) + 1))
+    for i, a in enumerate(first, 1):
+        current = [i]
+        for j, b in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a != b)))
+        previous = current
+    return previous[-1]
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def score(truth: List[Dict], subtitles: CueList) -> Dict:
+    """
+    Compare extracted subtitles with the ground truth cues
+
+    Each true cue is matched with the extracted subtitle overlapping it the
+    most. Character accuracy is 1 - edit distance / length per cue, 0 for
+    missed cues, averaged over the true cues.
+    """
+    extracted = [(cue.start_ms / 1000, cue.end_ms / 1000, cue.text) for cue in subtitles]
+    start_errors, end_errors, accuracies = [], [], []
+    for cue in truth:
+        best, best_overlap = None, 0.0
+        for start, end, text in extracted:
+            overlap = min(end, cue['end']) - max(start, cue['start'])
+            if overlap > best_overlap:
+                best, best_overlap = (start, end, text), overlap
+        if best is None:
+            accuracies.append(0.0)
+            continue
+        start, end, text = best
+        start_errors.append(abs(start - cue['start']))
+        end_errors.append(abs(end - cue['end']))
+        expected = _normalize(cue['text'])
+        accuracies.append(max(0.0, 1 - levenshtein(expected, _normalize(text)) / max(1, len(expected))))
+
+    return {
+        'cues': len(truth),
+        'subtitles': len(subtitles),
+        'matched': len(start_errors),
+        'start_error': float(np.mean(start_errors)) if start_errors else None,
+        'end_error': float(np.mean(end_errors)) if end_errors else None,
+        'char_accuracy': float(np.mean(accuracies)) if accuracies else None,
+    }
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process, None where the resource module is missing"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def run_mode(video_path: str, truth: List[Dict], options: Dict, lang: str,
+             use_gpu: bool, frame_rate: int) -> Dict:
+    """
+    Extract one video with one mode, in a fresh worker process
+    """
+    from core.subtitle_extractor import VideoSubtitleExtractor
+
+    extractor = VideoSubtitleExtractor(lang=lang, use_gpu=use_gpu)
+
+    # Count detector calls of every OCR instance the run may use, in this process
+    detector_calls = [0]
+    def counting(detector):
+        def call(img):
+            detector_calls[0] += 1
+            return detector(img)
+        return call
+    original = extractor.text_sys.text_detector
+    extractor.text_sys.text_detector = counting(original)
+
+    total_frames = extractor.get_video_metadata(video_path)['total_frames']
+
+    start = time.perf_counter()
+    try:
+        subtitles = extractor.extract_subtitles(video_path, frame_rate=frame_rate, use_cache=False, **options)
+    finally:
+        extractor.text_sys.text_detector = original
+    seconds = time.perf_counter() - start
+    peak_rss = _peak_rss_mb()
+
+    result = {
+        'seconds': round(seconds, 3),
+        'frames_per_second': round(total_frames / seconds, 2) if seconds else None,
+        # Extra OCR instances of the pipeline and parallel workers are not counted
+        'ocr_calls': detector_calls[0] if options.get('workers', 1) == 1 and options.get('ocr_workers', 1) == 1 else None,
+        'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+    }
+    result.update(score(truth, subtitles))
+    return result
+
+def compare(results: Dict, baseline: Dict, max_accuracy_drop: float) -> Tuple[Dict, List[str]]:
+    """
+    Speed-up and accuracy change of every (video, mode) also in the baseline
+
+    :return: Tuple of (comparison, list of regressions over max_accuracy_drop)
+    """
+    comparison, regressions = {}, []
+    for video, modes in results['videos'].items():
+        for mode, result in modes['modes'].items():
+            before = baseline.get('videos', {}).get(video, {}).get('modes', {}).get(mode)
+            if not before or 'error' in result or 'error' in before:
+                continue
+            drop = (before['char_accuracy'] or 0) - (result['char_accuracy'] or 0)
+            comparison.setdefault(video, {})[mode] = {
+                'speedup': round(before['seconds'] / result['seconds'], 3) if result['seconds'] else None,
+                'char_accuracy_change': round(-drop, 4),
+            }
+            if drop > max_accuracy_drop:
+                regressions.append(f"{video} / {mode}: char accuracy dropped by {drop:.4f}")
+    return comparison, regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.synthetic", description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modes', nargs='+', default=['no_gate_grab', 'default', 'batch', 'adaptive'],
+                        choices=list(MODES))
+    parser.add_argument('--duration', type=float, default=30.0, help="Length of each video in seconds")
+    parser.add_argument('--fps', type=float, default=25.0)
+    parser.add_argument('--frame-rate', type=int, default=5, help="frame_rate passed to extract_subtitles")
+    parser.add_argument('--lang', default='en')
+    parser.add_argument('--gpu', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--work-dir', default=None, help="Where videos are generated, a temporary directory by default")
+    parser.add_argument('--output', default=None, help="JSON file to write, stdout by default")
+    parser.add_argument('--baseline', default=None, help="Earlier output to compare with")
+    parser.add_argument('--max-accuracy-drop', type=float, default=0.005,
+                        help="Largest allowed char accuracy drop against the baseline")
+    args = parser.parse_args(argv)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="subtitle-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+
+    results = {'settings': vars(args), 'videos': {}}
+    for i, (width, height, background) in enumerate(DEFAULT_VIDEOS):
+        name = f"{width}x{height}-{background}"
+        video_path = os.path.join(work_dir, f"{name}.mp4")
+        truth = make_cues(args.duration, random.Random(args.seed + i))
+        generate_video(video_path, truth, width, height, fps=args.fps, duration=args.duration,
+                       background=background, seed=args.seed + i)
+
+        modes = {}
+        for mode in args.modes:
+            # A fresh process per mode, for a clean peak RSS and no state carried over
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                try:
+                    modes[mode] = executor.submit(run_mode, video_path, truth, MODES[mode], args.lang,
+                                                  args.gpu, args.frame_rate).result()
+                except Exception as e:
+                    modes[mode] = {'error': f"{type(e).__name__}: {e}"}
+            print(f"{name} {mode}: {modes[mode]}", file=sys.stderr, flush=True)
+        results['videos'][name] = {'width': width, 'height': height, 'background': background,
+                                   'cues': len(truth), 'modes': modes}
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            results['comparison'], regressions = compare(results, json.load(f), args.max_accuracy_drop)
+        results['regressions'] = regressions
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""
+Extract subtitles from many videos without the GUI
+
+Each input video gets its subtitles written next to it, in one or more
+formats streamed to disk while it is processed. A <name>.extracting marker
+sits next to them until the video is done, so files of an interrupted run
+are redone instead of skipped. Several videos are
+processed at once in a pool of worker processes, each loading the OCR models
+once, and a JSON summary is printed to stdout when all are done.
+
+Usage (from src):
+    python -m cli /archive/videos "/archive/**/*.mp4" --lang zh en --jobs 4
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence
+
+from core.checkpoint import checkpoint_path_for
+from core.writers import WRITERS, open_writers
+from utils import SUPPORTED_LANGUAGES, VIDEO_EXTENSIONS
+
+# Extractor of the current worker process, loaded once by _init_worker
+_worker_extractor = None
+
+def _init_worker(extractor_kwargs: Dict) -> None:
+    global _worker_extractor
+    from core.result_cache import ResultCache
+    from core.subtitle_extractor import VideoSubtitleExtractor
+
+    cache_dir = extractor_kwargs.pop('cache_dir', None)
+    use_cache = extractor_kwargs.pop('use_cache', True)
+    _worker_extractor = VideoSubtitleExtractor(
+        result_cache=ResultCache(cache_dir) if use_cache else None,
+        **extractor_kwargs
+    )
+
+def find_videos(inputs: List[str]) -> List[str]:
+    """
+    Expand files, directories and glob patterns into the list of videos to process
+
+    Directories are searched recursively. Only the formats the apps accept are
+    kept, and every video is listed once, in the order it was first found.
+    """
+    videos, seen = [], set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            paths = sorted(glob.glob(os.path.join(glob.escape(pattern), '**', '*'), recursive=True))
+        else:
+            paths = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+        for path in paths:
+            if not path.lower().endswith(VIDEO_EXTENSIONS) or not os.path.isfile(path):
+                continue
+            key = os.path.abspath(path)
+            if key not in seen:
+                seen.add(key)
+                videos.append(path)
+    return videos
+
+def output_paths_for(video_path: str, formats: Sequence[str] = ('srt',), dual_track: bool = False) -> List[str]:
+    """
+    Subtitle files written for a video, see core.writers.open_writers
+    """
+    base = os.path.splitext(video_path)[0]
+    tracks = (".1", ".2") if dual_track else ("",)
+    return [f"{base}{track}{WRITERS[fmt].extension}" for fmt in formats for track in tracks]
+
+def marker_path_for(video_path: str) -> str:
+    """
+    File present while the subtitles of a video are still being written
+    """
+    return f"{os.path.splitext(video_path)[0]}.extracting"
+
+def _process_video(video_path: str, extract_kwargs: Dict, formats: Sequence[str], dual_track: bool) -> Dict:
+    """
+    Extract the subtitles of one video in a worker process and stream them to files next to it
+    """
+    base = os.path.splitext(video_path)[0]
+    start = time.time()
+    try:
+        # Files grow while the video is processed, the marker tells partial ones apart
+        open(marker_path_for(video_path), 'w').close()
+        writers = open_writers(base, formats, dual_track=dual_track)
+        subtitles, stats = _worker_extractor.extract_subtitles(
+            video_path,
+            checkpoint_path=checkpoint_path_for(f"{base}.srt"),
+            resume=True,
+            return_stats=True,
+            writers=writers,
+            **extract_kwargs
+        )
+        os.remove(marker_path_for(video_path))
+    except Exception as e:
+        return {'input': video_path, 'outputs': [], 'status': 'failed',
+                'error': f"{type(e).__name__}: {e}", 'seconds': round(time.time() - start, 3)}
+    return {'input': video_path, 'outputs': output_paths_for(video_path, formats, dual_track), 'status': 'ok',
+            'subtitles': len(subtitles), 'seconds': round(time.time() - start, 3),
+            'stats': stats.summary()}
+
+def run_batch(videos: List[str], extractor_kwargs: Dict, extract_kwargs: Dict,
+              jobs: int = 1, overwrite: bool = False, log=None,
+              formats: Sequence[str] = ('srt',), dual_track: bool = False) -> List[Dict]:
+    """
+    Process videos with `jobs` worker processes
+
+    :param extractor_kwargs: VideoSubtitleExtractor arguments, plus use_cache and cache_dir
+    :param extract_kwargs: Extra arguments of extract_subtitles
+    :param overwrite: Process videos that already have their subtitle files, skipped otherwise
+    :param log: Callable receiving one line per finished video
+    :param formats: Subtitle formats to write, keys of core.writers.WRITERS
+    :param dual_track: Write the two languages of bilingual subtitles to separate files
+    :return: Result of every video, in the order of `videos`
+    """
+    results: Dict[str, Dict] = {}
+    pending = []
+    for video_path in videos:
+        outputs = output_paths_for(video_path, formats, dual_track)
+        done = all(os.path.exists(path) for path in outputs) and not os.path.exists(marker_path_for(video_path))
+        if not overwrite and done:
+            results[video_path] = {'input': video_path, 'outputs': outputs, 'status': 'skipped'}
+        else:
+            pending.append(video_path)
+
+    def report(result):
+        results[result['input']] = result
+        if log:
+            detail = result.get('error') or f"{result.get('subtitles', 0)} subtitles in {result['seconds']:.1f}s"
+            log(f"[{len(results)}/{len(videos)}] {result['status']}: {result['input']} ({detail})")
+
+    if pending:
+        jobs = max(1, min(jobs, len(pending)))
+        # Spawned workers, forking a process with loaded models is not safe
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(dict(extractor_kwargs),)) as executor:
+            futures = {executor.submit(_process_video, path, extract_kwargs, formats, dual_track): path
+                       for path in pending}
+            for future in as_completed(futures):
+                try:
+                    report(future.result())
+                except Exception as e:  # The worker itself died
+                    report({'input': futures[future], 'outputs': [], 'status': 'failed',
+                            'error': f"{type(e).__name__}: {e}", 'seconds': 0.0})
+
+    return [results[video_path] for video_path in videos]
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m cli",
+        description="Extract hardcoded subtitles from videos into subtitle files next to them."
+    )
+    parser.add_argument('inputs', nargs='+', help="Video files, directories or glob patterns")
+    parser.add_argument('--lang', nargs='+', default=['en'], choices=list(SUPPORTED_LANGUAGES),
+                        help="Subtitle language, two for bilingual subtitles (top line first)")
+    parser.add_argument('--jobs', type=int, default=1, help="Number of videos processed at once")
+    parser.add_argument('--gpu', action='store_true', help="Run OCR on the GPU")
+    parser.add_argument('--frame-rate', type=int, default=5, help="Frames processed per second of video")
+    parser.add_argument('--confidence', type=float, default=0.7, help="Subtitle confidence threshold")
+    parser.add_argument('--disappear', type=int, default=10,
+                        help="Processed frames without text after which a subtitle ends")
+    parser.add_argument('--sampling', default="auto", choices=("auto", "grab", "seek", "adaptive"),
+                        help="How frames are sampled from the video")
+    parser.add_argument('--batch-size', type=int, default=1, help="Frames recognized per OCR batch")
+    parser.add_argument('--calibrate-roi', action='store_true',
+                        help="Find the subtitle band of each video before extracting")
+    parser.add_argument('--no-roi', action='store_true', help="Detect text on the whole frame")
+    parser.add_argument('--no-cache', action='store_true', help="Do not use the result cache")
+    parser.add_argument('--cache-dir', default=None, help="Result cache directory")
+    parser.add_argument('--format', nargs='+', default=['srt'], choices=list(WRITERS), dest='formats',
+                        help="Subtitle formats to write, several at once in one pass")
+    parser.add_argument('--dual-track', action='store_true',
+                        help="Write each language of bilingual subtitles to its own file (<name>.1.srt, <name>.2.srt)")
+    parser.add_argument('--overwrite', action='store_true',
+                        help="Process videos that already have their subtitle files")
+    parser.add_argument('--stats', action='store_true',
+                        help="Include per-stage timings and counters of each video in the summary")
+    parser.add_argument('--quiet', action='store_true', help="Do not log finished videos to stderr")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    videos = find_videos(args.inputs)
+
+    extractor_kwargs = {
+        'lang': args.lang[0] if len(args.lang) == 1 else args.lang,
+        'use_gpu': args.gpu,
+        'use_roi': not args.no_roi,
+        'use_cache': not args.no_cache,
+        'cache_dir': args.cache_dir,
+    }
+    extract_kwargs = {
+        'frame_rate': args.frame_rate,
+        'confidence_threshold': args.confidence,
+        'subtitle_disappear_threshold': args.disappear,
+        'sampling': args.sampling,
+        'batch_size': args.batch_size,
+        'calibrate_roi': args.calibrate_roi,
+    }
+
+    start = time.time()
+    log = None if args.quiet else (lambda line: print(line, file=sys.stderr, flush=True))
+    results = run_batch(videos, extractor_kwargs, extract_kwargs, jobs=args.jobs,
+                        overwrite=args.overwrite, log=log, formats=args.formats, dual_track=args.dual_track)
+    if not args.stats:
+        for result in results:
+            result.pop('stats', None)
+
+    summary = {
+        'videos': results,
+        'total': len(results),
+        'ok': sum(result['status'] == 'ok' for result in results),
+        'skipped': sum(result['status'] == 'skipped' for result in results),
+        'failed': sum(result['status'] == 'failed' for result in results),
+        'seconds': round(time.time() - start, 3),
+    }
+    json.dump(summary, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+    return 1 if summary['failed'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
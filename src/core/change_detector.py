@@ -0,0 +1,129 @@
+import cv2
+import numpy as np
+from typing import Dict, Optional
+
+class SubtitleChangeDetector:
+    """
+    Cheap pre-OCR gate for the subtitle band.
+
+    Each band is reduced to a small binary fingerprint of text-like pixels
+    (bright glyph pixels next to a strong edge, i.e. the usual white-with-outline
+    subtitle look) and compared with the fingerprint of the last band that went
+    through OCR. Comparing against the last OCR'd band rather than the previous
+    sample keeps slow fades from drifting past the threshold unnoticed.
+
+    Subtitles without that look (grey or pastel text, no outline) barely show
+    up in the fingerprint, so a band is still sent to OCR after `refresh_interval`
+    skips in a row, and after `empty_refresh_interval` skips when the reference
+    holds almost no text pixels.
+    """
+
+    def __init__(self, threshold: float = 0.1, width: int = 160,
+                 bright_threshold: int = 180, edge_threshold: int = 60,
+                 min_changed_pixels: int = 4, refresh_interval: int = 10,
+                 empty_refresh_interval: int = 2, min_text_pixels: int = 8) -> None:
+        """
+        :param threshold: Maximum changed fraction of text pixels to treat a band as unchanged
+        :param width: Width in pixels the band is downscaled to before fingerprinting
+        :param bright_threshold: Minimum gray level of a glyph pixel
+        :param edge_threshold: Minimum morphological gradient for a pixel to count as outlined
+        :param min_changed_pixels: Changes up to this many pixels are always ignored as noise
+        :param refresh_interval: Maximum number of bands skipped in a row before OCR runs anyway
+        :param empty_refresh_interval: Same, when the reference has fewer than `min_text_pixels` text pixels
+        :param min_text_pixels: Text pixels below which the reference counts as empty
+        """
+        self.threshold = threshold
+        self.width = width
+        self.bright_threshold = bright_threshold
+        self.edge_threshold = edge_threshold
+        self.min_changed_pixels = min_changed_pixels
+        self.refresh_interval = max(1, refresh_interval)
+        self.empty_refresh_interval = max(1, empty_refresh_interval)
+        self.min_text_pixels = min_text_pixels
+        self.kernel = np.ones((3, 3), np.uint8)
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the reference fingerprint and counters, call once per video"""
+        self.reference: Optional[np.ndarray] = None
+        self.reference_empty = True
+        self.skipped = 0  # Bands skipped since the last OCR
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def fingerprint(self, band: np.ndarray) -> np.ndarray:
+        """
+        Downscaled boolean mask of text-like pixels in the band
+        """
+        gray = cv2.cvtColor(band, cv2.COLOR_BGR2GRAY) if band.ndim == 3 else band
+        h, w = gray.shape[:2]
+        height = max(1, int(round(h * self.width / max(w, 1))))
+        small = cv2.resize(gray, (self.width, height), interpolation=cv2.INTER_AREA)
+
+        bright = small >= self.bright_threshold
+        gradient = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, self.kernel)
+        outlined = cv2.dilate((gradient >= self.edge_threshold).astype(np.uint8), self.kernel) > 0
+        return bright & outlined
+
+    def compare(self, first: Optional[np.ndarray], second: np.ndarray) -> float:
+        """
+        Fraction of text pixels that differ between two fingerprints
+        """
+        if first is None or first.shape != second.shape:
+            return 1.0
+
+        changed = int(np.count_nonzero(first ^ second))
+        if changed <= self.min_changed_pixels:
+            return 0.0
+        union = int(np.count_nonzero(first | second))
+        return changed / max(union, 1)
+
+    def changed(self, first: Optional[np.ndarray], second: np.ndarray) -> bool:
+        """
+        Whether two fingerprints show different subtitles
+        """
+        return self.compare(first, second) >= self.threshold
+
+    def difference(self, fingerprint: np.ndarray) -> float:
+        """
+        Fraction of text pixels that differ from the reference fingerprint
+        """
+        return self.compare(self.reference, fingerprint)
+
+    def is_unchanged(self, band: np.ndarray) -> bool:
+        """
+        Check whether OCR can be skipped for this band
+
+        When the band changed, or is due for a refresh, it becomes the new
+        reference, as the caller is expected to run OCR on it.
+        """
+        fingerprint = self.fingerprint(band)
+        if self.difference(fingerprint) < self.threshold:
+            limit = self.empty_refresh_interval if self.reference_empty else self.refresh_interval
+            if self.skipped < limit:
+                self.skipped += 1
+                self.hits += 1
+                return True
+            self.refreshes += 1
+
+        self.reference = fingerprint
+        self.reference_empty = int(np.count_nonzero(fingerprint)) < self.min_text_pixels
+        self.skipped = 0
+        self.misses += 1
+        return False
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {
+            'frames_checked': self.hits + self.misses,
+            'ocr_skipped': self.hits,
+            'ocr_run': self.misses,
+            'ocr_refreshed': self.refreshes,
+            'hit_rate': self.hit_rate,
+        }
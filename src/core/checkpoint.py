@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+from typing import Dict, Optional
+
+# Version 2: cues stored as CueList columns of milliseconds
+CHECKPOINT_VERSION = 2
+
+def checkpoint_path_for(output_path: str) -> str:
+    """
+    Checkpoint file kept next to a subtitle output file
+    """
+    return f"{output_path}.checkpoint.json"
+
+def video_identity(video_path: str) -> Dict:
+    """
+    Cheap identity of a video file, a checkpoint only applies to the same file
+    """
+    stat = os.stat(video_path)
+    return {'path': os.path.abspath(video_path), 'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+def save_checkpoint(path: str, state: Dict) -> None:
+    """
+    Write a checkpoint atomically
+
+    The state is written to a temporary file in the same directory, synced and
+    renamed over the previous checkpoint, so a crash at any point leaves either
+    the old or the new checkpoint on disk, never a truncated one.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".checkpoint-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(dict(state, version=CHECKPOINT_VERSION), f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def load_checkpoint(path: str, video: Dict, params: Dict) -> Optional[Dict]:
+    """
+    Load a checkpoint if it belongs to this video and these extraction parameters
+
+    :param video: Identity of the video, see video_identity
+    :param params: Extraction parameters the cues depend on
+    :return: Checkpoint state, or None when there is no usable checkpoint
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if state.get('version') != CHECKPOINT_VERSION:
+        return None
+    if state.get('video') != video or state.get('params') != params:
+        return None
+    return state
+
+def remove_checkpoint(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,212 @@
+import math
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Union
+
+def format_timestamp(ms: int, separator: str = ",") -> str:
+    """
+    Format milliseconds as an SRT timestamp, HH:MM:SS,mmm (use separator "." for WebVTT)
+    """
+    seconds, millis = divmod(int(ms), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{millis:03d}"
+
+def format_srt_cue(index: int, start_ms: int, end_ms: int, text: str) -> str:
+    """
+    One numbered SRT block, blank line included
+    """
+    return f"{index}\n{format_timestamp(start_ms)} --> {format_timestamp(end_ms)}\n{text}\n\n"
+
+def parse_timestamp(timestamp: str) -> int:
+    """
+    Milliseconds of an SRT or WebVTT timestamp
+    """
+    hours, minutes, rest = timestamp.replace('.', ',').split(':')
+    seconds, millis = rest.split(',')
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis)
+
+class Cue(Mapping):
+    """
+    One subtitle with numeric times, read like the former cue dicts
+
+    `cue['start_time']` and `cue['end_time']` give SRT timestamps formatted on
+    access, `cue['text']` the text, and dict(cue) the plain dict.
+
+    Cues from the tracker also carry the recognition `confidence` and the
+    `box` [x_min, y_min, x_max, y_max] of their text in the frame they started
+    on, None when unknown (e.g. cues parsed back from an SRT file).
+    """
+
+    __slots__ = ('start_ms', 'end_ms', 'text', 'confidence', 'box')
+    _KEYS = ('start_time', 'end_time', 'text')
+
+    def __init__(self, start_ms: int, end_ms: int, text: str, confidence: Optional[float] = None,
+                 box: Optional[List[int]] = None) -> None:
+        self.start_ms = int(start_ms)
+        self.end_ms = int(end_ms)
+        self.text = text
+        self.confidence = confidence
+        self.box = box
+
+    def __getitem__(self, key: str):
+        if key == 'start_time':
+            return format_timestamp(self.start_ms)
+        if key == 'end_time':
+            return format_timestamp(self.end_ms)
+        if key == 'text':
+            return self.text
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return f"Cue({self['start_time']} --> {self['end_time']}, {self.text!r})"
+
+    @classmethod
+    def from_mapping(cls, cue: Mapping) -> "Cue":
+        """
+        Cue from a Cue or a dict with formatted start_time / end_time
+        """
+        if isinstance(cue, Cue):
+            return cue
+        return cls(parse_timestamp(cue['start_time']), parse_timestamp(cue['end_time']), cue['text'],
+                   cue.get('confidence'), cue.get('box'))
+
+# Box column value of a cue without a box
+NO_BOX = (-1, -1, -1, -1)
+
+class CueList:
+    """
+    Compact list of cues: times in int64 arrays of milliseconds, texts interned
+
+    Confidences are kept in a float32 array (NaN when unknown) and boxes as
+    four int32 values per cue (-1 when unknown). Appending is amortized O(1)
+    and slicing gives another CueList. Items are Cue views, so code indexing
+    cues as dicts keeps working. Timestamps are only formatted when written
+    out, in one pass by to_srt / write_srt.
+    """
+
+    def __init__(self, cues: Iterable[Mapping] = ()) -> None:
+        self.start_ms = array('q')
+        self.end_ms = array('q')
+        self.texts: List[str] = []
+        self.confidences = array('f')
+        self.boxes = array('i')
+        self.extend(cues)
+
+    def append_ms(self, start_ms: int, end_ms: int, text: str, confidence: Optional[float] = None,
+                  box: Optional[List[int]] = None) -> None:
+        self.start_ms.append(int(start_ms))
+        self.end_ms.append(int(end_ms))
+        # Repeated lines (names, sound effects, songs) share one string
+        self.texts.append(sys.intern(text))
+        self.confidences.append(math.nan if confidence is None else float(confidence))
+        self.boxes.extend(NO_BOX if box is None else (int(v) for v in box))
+
+    def append(self, cue: Mapping) -> None:
+        cue = Cue.from_mapping(cue)
+        self.append_ms(cue.start_ms, cue.end_ms, cue.text, cue.confidence, cue.box)
+
+    def extend(self, cues: Iterable[Mapping]) -> None:
+        if isinstance(cues, CueList):
+            self.start_ms.extend(cues.start_ms)
+            self.end_ms.extend(cues.end_ms)
+            self.texts.extend(cues.texts)
+            self.confidences.extend(cues.confidences)
+            self.boxes.extend(cues.boxes)
+            return
+        for cue in cues:
+            self.append(cue)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __bool__(self) -> bool:
+        return bool(self.texts)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Cue, "CueList"]:
+        if isinstance(index, slice):
+            sliced = CueList()
+            sliced.start_ms = self.start_ms[index]
+            sliced.end_ms = self.end_ms[index]
+            sliced.texts = self.texts[index]
+            sliced.confidences = self.confidences[index]
+            sliced.boxes = array('i')
+            for i in range(*index.indices(len(self))):
+                sliced.boxes.extend(self.boxes[4 * i:4 * i + 4])
+            return sliced
+        index = range(len(self))[index]
+        return Cue(self.start_ms[index], self.end_ms[index], self.texts[index],
+                   self._confidence(index), self._box(index))
+
+    def _confidence(self, index: int) -> Optional[float]:
+        confidence = self.confidences[index]
+        # Back from float32 to the 4 decimals the tracker rounds to
+        return None if math.isnan(confidence) else round(confidence, 4)
+
+    def _box(self, index: int) -> Optional[List[int]]:
+        box = self.boxes[4 * index:4 * index + 4].tolist()
+        return None if tuple(box) == NO_BOX else box
+
+    def __iter__(self) -> Iterator[Cue]:
+        for i, (start_ms, end_ms, text) in enumerate(zip(self.start_ms, self.end_ms, self.texts)):
+            yield Cue(start_ms, end_ms, text, self._confidence(i), self._box(i))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, CueList):
+            return NotImplemented
+        return self.start_ms == other.start_ms and self.end_ms == other.end_ms and self.texts == other.texts
+
+    def __repr__(self) -> str:
+        return f"CueList({len(self)} cues)"
+
+    def iter_srt(self, start_index: int = 1) -> Iterator[str]:
+        """
+        SRT blocks of the cues, numbered from start_index
+        """
+        for i, (start_ms, end_ms, text) in enumerate(zip(self.start_ms, self.end_ms, self.texts), start_index):
+            yield format_srt_cue(i, start_ms, end_ms, text)
+
+    def to_srt(self) -> str:
+        return "".join(self.iter_srt())
+
+    def write_srt(self, f: IO[str]) -> None:
+        f.writelines(self.iter_srt())
+
+    def to_dicts(self) -> List[Dict]:
+        """
+        Cues as plain dicts with formatted timestamps, confidence and box, e.g. for JSON APIs
+        """
+        return [dict(cue, confidence=cue.confidence, box=cue.box) for cue in self]
+
+    def to_compact(self) -> Dict[str, list]:
+        """
+        JSON-friendly columns, the inverse of from_compact
+
+        Unknown confidences are null, boxes are a flat list of four values per cue.
+        """
+        return {
+            'start_ms': self.start_ms.tolist(),
+            'end_ms': self.end_ms.tolist(),
+            'text': list(self.texts),
+            'confidence': [self._confidence(i) for i in range(len(self))],
+            'box': self.boxes.tolist(),
+        }
+
+    @classmethod
+    def from_compact(cls, data: Dict[str, list]) -> "CueList":
+        cues = cls()
+        cues.start_ms = array('q', data['start_ms'])
+        cues.end_ms = array('q', data['end_ms'])
+        cues.texts = [sys.intern(text) for text in data['text']]
+        # Caches and checkpoints of older versions have no metadata columns
+        confidences = data.get('confidence') or [None] * len(cues.texts)
+        cues.confidences = array('f', (math.nan if c is None else c for c in confidences))
+        cues.boxes = array('i', data.get('box') or NO_BOX * len(cues.texts))
+        return cues
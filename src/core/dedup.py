@@ -0,0 +1,137 @@
+import re
+from collections import Counter, deque
+from typing import Dict, List, Tuple
+
+_LINE_BREAKS = re.compile(r'[\n\r]+')
+
+def normalize_subtitle_text(text: str) -> str:
+    """
+    Normalize subtitle text by handling multiline and cleaning up spaces
+
+    :param text: Raw subtitle text
+    :return: Non-empty lines with single spaces, joined with newlines
+    """
+    lines = (' '.join(line.split()) for line in _LINE_BREAKS.split(text))
+    return "\n".join(line for line in lines if line)
+
+def dedup_key(text: str) -> str:
+    """
+    Comparison form of a subtitle: normalized, without spaces and lowercased
+    """
+    return normalize_subtitle_text(text).replace(' ', '').lower()
+
+def indel_distance(first: str, second: str, max_distance: int) -> int:
+    """
+    Number of character insertions and deletions turning one string into the other
+
+    Only the diagonal band of width 2 * max_distance + 1 is computed, and the
+    computation stops as soon as a whole row exceeds `max_distance`.
+
+    :return: The distance, or max_distance + 1 when it is larger than max_distance
+    """
+    n, m = len(first), len(second)
+    limit = max_distance + 1
+    if abs(n - m) > max_distance:
+        return limit
+
+    previous = [j if j <= max_distance else limit for j in range(m + 1)]
+    for i in range(1, n + 1):
+        current = [limit] * (m + 1)
+        current[0] = i if i <= max_distance else limit
+        row_min = current[0]
+        char = first[i - 1]
+        for j in range(max(1, i - max_distance), min(m, i + max_distance) + 1):
+            if char == second[j - 1]:
+                value = previous[j - 1]
+            else:
+                value = min(previous[j], current[j - 1]) + 1
+                if value > limit:
+                    value = limit
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return limit
+        previous = current
+    return previous[m]
+
+class DedupWindow:
+    """
+    Fixed-size window of recently started subtitles, to tell whether a text is a repeat
+
+    Entries are normalized once when added. A candidate is a duplicate of an
+    entry when their indel similarity, 2 * LCS / (len(a) + len(b)), reaches
+    `threshold`. Exact repeats, the common case of a subtitle read again on
+    the next sampled frame, are answered from a hash lookup, and the others
+    are ruled out by length and character count bounds before the banded
+    distance is computed.
+    """
+
+    def __init__(self, size: int = 10, threshold: float = 0.8) -> None:
+        """
+        :param size: Number of most recent subtitles compared against
+        :param threshold: Minimum similarity for a text to count as a duplicate
+        """
+        self.size = max(1, size)
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget every entry, call once per video"""
+        self._entries: deque = deque(maxlen=self.size)  # (text, key, character counts)
+        self._keys: Dict[str, int] = {}
+        self._last: Tuple[str, str] = ("", "")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def texts(self) -> List[str]:
+        """Texts in the window, oldest first"""
+        return [text for text, _, _ in self._entries]
+
+    def _key(self, text: str) -> str:
+        # The same text is usually checked on many sampled frames in a row
+        if self._last[0] != text:
+            self._last = (text, dedup_key(text))
+        return self._last[1]
+
+    def is_duplicate(self, text: str) -> bool:
+        """
+        Whether text is similar enough to one of the subtitles in the window
+        """
+        key = self._key(text)
+        if key in self._keys:
+            return True
+
+        length = len(key)
+        counts = None
+        for _, other, other_counts in self._entries:
+            total = length + len(other)
+            if not total:
+                continue
+            # Most differences allowed for the similarity to reach the threshold
+            max_distance = int((1.0 - self.threshold) * total + 1e-9)
+            if abs(length - len(other)) > max_distance:
+                continue
+            if counts is None:
+                counts = Counter(key)
+            common = sum((counts & other_counts).values())
+            if total - 2 * common > max_distance:
+                continue
+            if indel_distance(key, other, max_distance) <= max_distance:
+                return True
+        return False
+
+    def add(self, text: str) -> None:
+        """
+        Add a subtitle to the window, dropping the oldest one when it is full
+        """
+        key = self._key(text)
+        if len(self._entries) == self.size:
+            _, old_key, _ = self._entries[0]
+            self._keys[old_key] -= 1
+            if not self._keys[old_key]:
+                del self._keys[old_key]
+        self._entries.append((text, key, Counter(key)))
+        self._keys[key] = self._keys.get(key, 0) + 1
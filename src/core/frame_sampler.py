@@ -0,0 +1,204 @@
+import cv2
+import itertools
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from .stats import NULL_STATS, ExtractionStats
+
+SAMPLING_MODES = ("auto", "grab", "seek")
+
+class FrameSampler:
+    """
+    Iterate over every `frame_skip`-th frame of an opened video capture.
+
+    Skipped frames are never retrieved (no BGR conversion / copy). Depending on
+    the mode they are either stepped over with `cap.grab()` or jumped with a
+    positional seek:
+
+    - "grab": always step frame by frame with `grab()`
+    - "seek": always seek straight to the next sampled frame
+    - "auto": grab across short gaps, seek across gaps of at least
+      `seek_threshold` frames, where decoding forward from the previous
+      keyframe is cheaper than decoding every frame in between
+
+    With a `frame_times` dict, the presentation time of every retrieved frame is
+    stored in it by frame index, for variable frame rate videos where
+    index / fps drifts. Consumers pop the entries they use.
+
+    Decoder work is counted into `stats`: frames_retrieved, frames_grabbed
+    (decoded without retrieval), frames_decoded (both) and frames_seeked
+    (jumped over by seeks).
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, frame_skip: int, total_frames: int = 0,
+                 mode: str = "auto", seek_threshold: int = 120,
+                 start_frame: int = 0, end_frame: Optional[int] = None,
+                 frame_times: Optional[Dict[int, int]] = None,
+                 stats: ExtractionStats = NULL_STATS) -> None:
+        """
+        :param cap: Opened video capture positioned at frame 0
+        :param frame_skip: Distance in frames between two sampled frames
+        :param total_frames: Frame count reported by the container (<= 0 if unknown)
+        :param mode: One of SAMPLING_MODES
+        :param seek_threshold: Minimum gap in frames for which "auto" seeks
+        :param start_frame: First frame of the range to sample
+        :param end_frame: End (exclusive) of the range to sample, defaults to total_frames
+        :param frame_times: Dict receiving the millisecond timestamp of every retrieved frame
+        :param stats: ExtractionStats the decoder counters go to
+        """
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Sampling mode '{mode}' not supported. Use one of: {', '.join(SAMPLING_MODES)}")
+
+        self.cap = cap
+        self.frame_skip = max(1, int(frame_skip))
+        self.total_frames = total_frames
+        self.mode = mode
+        self.seek_threshold = max(1, seek_threshold)
+        # Sampled frames stay on the multiples of frame_skip whatever the range
+        self.start_frame = -(-max(0, start_frame) // self.frame_skip) * self.frame_skip
+        self.end_frame = end_frame if end_frame is not None else (total_frames if total_frames > 0 else None)
+        self.frame_times = frame_times
+        self.stats = stats
+
+        # Seeking needs a known end, otherwise fall back to sequential grabbing
+        if self.end_frame is None and self.mode == "seek":
+            self.mode = "grab"
+
+    def _should_seek(self, gap: int) -> bool:
+        if gap <= 0 or self.mode == "grab":
+            return False
+        if self.mode == "seek":
+            return True
+        return gap >= self.seek_threshold
+
+    def _read_at(self, index: int) -> Optional[np.ndarray]:
+        """
+        Retrieve one frame, grabbing forward or seeking from the current decoder position
+        """
+        gap = index - self.position
+        if gap < 0 or self._should_seek(gap):
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self.position = index
+            self.stats.count("frames_seeked", max(0, gap))
+        else:
+            # Decode without retrieving the frames we are not going to use
+            grabbed = 0
+            while self.position < index:
+                if not self.cap.grab():
+                    break
+                self.position += 1
+                grabbed += 1
+            if grabbed:
+                self.stats.count("frames_grabbed", grabbed)
+                self.stats.count("frames_decoded", grabbed)
+            if self.position < index:
+                return None
+
+        success, frame = self.cap.read()
+        if not success:
+            return None
+        self.position += 1
+        self.stats.count("frames_retrieved")
+        self.stats.count("frames_decoded")
+        if self.frame_times is not None:
+            # Timestamp of the frame just read, right after seeks too, unlike frame counting
+            self.frame_times[index] = int(round(self.cap.get(cv2.CAP_PROP_POS_MSEC)))
+        return frame
+
+    def _indices(self) -> Iterable[int]:
+        if self.end_frame is not None:
+            return range(self.start_frame, self.end_frame, self.frame_skip)
+        return itertools.count(self.start_frame, self.frame_skip)
+
+    def _start(self) -> None:
+        self.position = 0  # Index of the frame the decoder returns next
+        if self.start_frame > 0:
+            # Never decode our way to the start of a range
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+            self.position = self.start_frame
+            self.stats.count("frames_seeked", self.start_frame)
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Yield (frame_index, frame) for every sampled frame in order
+        """
+        self._start()
+        for index in self._indices():
+            frame = self._read_at(index)
+            if frame is None:
+                return
+            yield index, frame
+
+class AdaptiveFrameSampler(FrameSampler):
+    """
+    Coarse sampler that refines the frames where the subtitle band changes
+
+    Frames are scanned every `frame_skip` frames. When the band fingerprint of a
+    sample differs from the previous one, the interval between them is bisected
+    with seeks until the exact change frame is found, and both the last frame
+    before the change and the first one after it are yielded as well. Cue
+    boundaries are then accurate to the frame while only O(log gap) extra frames
+    are decoded per change, and only the frames after a change need OCR.
+
+    The bisection assumes a single change per coarse interval, so `frame_skip`
+    should stay below the shortest subtitle duration.
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, frame_skip: int,
+                 fingerprint: Callable[[np.ndarray], np.ndarray],
+                 changed: Callable[[np.ndarray, np.ndarray], bool],
+                 total_frames: int = 0, seek_threshold: int = 120,
+                 start_frame: int = 0, end_frame: Optional[int] = None,
+                 frame_times: Optional[Dict[int, int]] = None,
+                 stats: ExtractionStats = NULL_STATS) -> None:
+        """
+        :param fingerprint: Reduces a frame to the fingerprint of its subtitle band
+        :param changed: Tells whether two fingerprints show different subtitles
+        """
+        super().__init__(cap, frame_skip, total_frames, mode="auto", seek_threshold=seek_threshold,
+                         start_frame=start_frame, end_frame=end_frame, frame_times=frame_times,
+                         stats=stats)
+        self.fingerprint = fingerprint
+        self.changed = changed
+        self.refined_frames = 0  # Extra frames decoded by bisection
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        self._start()
+        previous = None  # (index, frame, fingerprint) of the last coarse sample
+        for index in self._indices():
+            frame = self._read_at(index)
+            if frame is None:
+                return
+            fingerprint = self.fingerprint(frame)
+
+            if previous is not None and index - previous[0] > 1 and self.changed(previous[2], fingerprint):
+                # Bisect: `low` still looks like the previous sample, `high` like the new one
+                low, low_frame = previous[0], previous[1]
+                high, high_frame = index, frame
+                probed = []
+                while high - low > 1:
+                    middle = (low + high) // 2
+                    middle_frame = self._read_at(middle)
+                    if middle_frame is None:
+                        break
+                    self.refined_frames += 1
+                    self.stats.count("frames_refined")
+                    probed.append(middle)
+                    if self.changed(previous[2], self.fingerprint(middle_frame)):
+                        high, high_frame = middle, middle_frame
+                    else:
+                        low, low_frame = middle, middle_frame
+                if self.frame_times is not None:
+                    # Only the yielded frames are consumed
+                    for middle in probed:
+                        if middle not in (low, high):
+                            self.frame_times.pop(middle, None)
+
+                if low != previous[0]:
+                    yield low, low_frame
+                if high != index:
+                    yield high, high_frame
+
+            yield index, frame
+            previous = (index, frame, fingerprint)
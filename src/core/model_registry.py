@@ -0,0 +1,139 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import paddleocr.tools.infer.predict_det as predict_det
+import paddleocr.tools.infer.predict_rec as predict_rec
+
+from utils import init_args
+from .text_ocr import TextOcr, MultiLangTextOcr
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+class SharedPredictor:
+    """
+    Paddle predictor shared between threads, calls are serialized with a lock
+    """
+
+    def __init__(self, predictor, size: int = 0) -> None:
+        self.predictor = predictor
+        self.size = size
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            return self.predictor(*args, **kwargs)
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded OCR models
+
+    Building a TextOcr parses the inference arguments, loads the Paddle
+    predictors from `weights/` and warms them up, which takes seconds. The
+    registry does it once and hands out light TextOcr wrappers around the
+    shared predictors. The detector in `weights/det` is the same for every
+    language, so detectors are cached per device and recognizers per
+    (lang, device). Least recently used models are evicted once there are more
+    than `max_entries` of them or their weights exceed `max_memory_mb`.
+
+    Calls on a shared predictor are serialized, so concurrent sessions using the
+    same model queue up instead of racing.
+    """
+
+    def __init__(self, max_entries: int = 8, max_memory_mb: Optional[float] = None) -> None:
+        """
+        :param max_entries: Maximum number of loaded predictors (detectors and recognizers)
+        :param max_memory_mb: Maximum total size of loaded weights, None for no limit
+        """
+        self.max_entries = max(2, max_entries)
+        self.max_memory_mb = max_memory_mb
+        self._entries: "OrderedDict[Tuple, SharedPredictor]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[Tuple, threading.Lock] = {}
+
+    def get_text_ocr(self, lang: Union[str, Sequence[str]] = "en", use_gpu: bool = False,
+                     rec_mode: str = "position") -> TextOcr:
+        """
+        Get a TextOcr backed by the cached models for these languages and device
+
+        Each call returns a new TextOcr with its own arguments, so per-extractor
+        settings like the subtitle ROI do not leak between callers.
+
+        :param lang: Language code, or several for bilingual subtitles (MultiLangTextOcr)
+        :param rec_mode: Recognizer routing of MultiLangTextOcr ("position" or "confidence")
+        """
+        langs = [lang] if isinstance(lang, str) else list(lang)
+        args = init_args(langs[0], use_gpu)
+        text_detector = self._get(("det", use_gpu), args)
+        if len(langs) == 1:
+            return TextOcr(args, text_detector, self._get(("rec", langs[0], use_gpu), args))
+
+        text_recognizers = {}
+        for code in langs:
+            text_recognizers[code] = self._get(("rec", code, use_gpu), init_args(code, use_gpu))
+        return MultiLangTextOcr(args, text_detector, text_recognizers, rec_mode=rec_mode)
+
+    def _get(self, key: Tuple, args) -> SharedPredictor:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock, only one thread loads a given key
+        with loading:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    return entry
+
+            if key[0] == "det":
+                entry = SharedPredictor(predict_det.TextDetector(args), _dir_size(args.det_model_dir))
+            else:
+                entry = SharedPredictor(predict_rec.TextRecognizer(args), _dir_size(args.rec_model_dir))
+
+            with self._lock:
+                self._entries[key] = entry
+                self._loading.pop(key, None)
+                self._evict(keep=key)
+        return entry
+
+    def _evict(self, keep: Tuple) -> None:
+        # Extractors still holding an evicted model keep it alive until they are done
+        limit = self.max_memory_mb * 1024 * 1024 if self.max_memory_mb else None
+        while len(self._entries) > 1:
+            over_count = len(self._entries) > self.max_entries
+            over_memory = limit is not None and self.memory_usage > limit
+            if not (over_count or over_memory):
+                break
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            del self._entries[key]
+
+    @property
+    def memory_usage(self) -> int:
+        """Total size in bytes of the weights currently loaded"""
+        return sum(entry.size for entry in self._entries.values())
+
+    def keys(self) -> List[Tuple]:
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+# Shared by every extractor of the process unless one is passed explicitly
+default_registry = ModelRegistry()
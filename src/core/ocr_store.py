@@ -0,0 +1,144 @@
+import json
+import os
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .cues import CueList
+from .subtitle_tracker import SubtitleTracker
+
+class OcrResultRecorder:
+    """
+    Collects the raw OCR result of every sampled frame and saves it as NumPy columns
+
+    Thresholds are only applied after OCR, so with these results saved, cues can
+    be rebuilt for any `confidence_threshold` / `subtitle_disappear_threshold`
+    in seconds (see resegment_ocr_results) instead of re-running the models.
+
+    Layout of the .npz file:
+
+    - frames (S,) int64: index of each sampled frame
+    - offsets (S + 1,) int64: lines of frame i are offsets[i]:offsets[i + 1]
+    - boxes (L, 4, 2) float32: line boxes in frame coordinates, NaN when unknown
+    - texts (L,) str and confidences (L,) float32: recognized lines
+    - times (S,) int64: millisecond timestamp of each sampled frame, -1 unless the video
+      has a variable frame rate
+    - meta: JSON with fps and the sampling settings
+    """
+
+    def __init__(self, meta: Optional[Dict] = None) -> None:
+        self.meta = dict(meta or {})
+        self.frames: List[int] = []
+        self.times: List[int] = []
+        self.offsets: List[int] = [0]
+        self.boxes: List[np.ndarray] = []
+        self.texts: List[str] = []
+        self.confidences: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def add(self, frame_index: int, dt_boxes, rec_res, time_ms: Optional[int] = None) -> None:
+        """
+        Record the OCR result of one sampled frame, as returned by TextOcr
+
+        :param time_ms: Timestamp of the frame, when it is not frame_index / fps
+        """
+        rec_res = rec_res or []
+        for i, (text, conf) in enumerate(rec_res):
+            if dt_boxes is not None and i < len(dt_boxes):
+                self.boxes.append(np.asarray(dt_boxes[i], dtype=np.float32).reshape(4, 2))
+            else:
+                self.boxes.append(np.full((4, 2), np.nan, dtype=np.float32))
+            self.texts.append(text)
+            self.confidences.append(float(conf))
+        self.frames.append(int(frame_index))
+        self.times.append(-1 if time_ms is None else int(time_ms))
+        self.offsets.append(len(self.texts))
+
+    def truncate(self, end_frame: int) -> None:
+        """
+        Drop the results of frames from `end_frame` on, e.g. when resuming from an earlier checkpoint
+        """
+        keep = int(np.searchsorted(np.asarray(self.frames, dtype=np.int64), end_frame))
+        lines = self.offsets[keep]
+        del self.frames[keep:]
+        del self.times[keep:]
+        del self.offsets[keep + 1:]
+        del self.boxes[lines:]
+        del self.texts[lines:]
+        del self.confidences[lines:]
+
+    def save(self, path: str) -> None:
+        """
+        Write the results atomically to a compressed .npz file
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".ocr-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(
+                    f,
+                    frames=np.asarray(self.frames, dtype=np.int64),
+                    offsets=np.asarray(self.offsets, dtype=np.int64),
+                    boxes=np.asarray(self.boxes, dtype=np.float32).reshape(-1, 4, 2),
+                    texts=np.asarray(self.texts, dtype=str),
+                    confidences=np.asarray(self.confidences, dtype=np.float32),
+                    times=np.asarray(self.times, dtype=np.int64),
+                    meta=np.asarray(json.dumps(self.meta)),
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "OcrResultRecorder":
+        with np.load(path, allow_pickle=False) as data:
+            recorder = cls(json.loads(str(data['meta'])))
+            recorder.frames = data['frames'].tolist()
+            recorder.offsets = data['offsets'].tolist()
+            recorder.boxes = list(data['boxes'])
+            recorder.texts = data['texts'].tolist()
+            recorder.confidences = data['confidences'].tolist()
+            # Files of older versions have no timestamps
+            if 'times' in data.files:
+                recorder.times = data['times'].tolist()
+            else:
+                recorder.times = [-1] * len(recorder.frames)
+        return recorder
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray, List[Tuple[str, float]]]]:
+        """
+        Yield (frame_index, boxes, rec_res) for every recorded frame
+        """
+        for i, frame_index in enumerate(self.frames):
+            start, end = self.offsets[i], self.offsets[i + 1]
+            rec_res = list(zip(self.texts[start:end], self.confidences[start:end]))
+            yield frame_index, self.boxes[start:end], rec_res
+
+    def frame_time(self, i: int) -> Optional[int]:
+        """
+        Timestamp of the i-th recorded frame, None if it was not recorded
+        """
+        return self.times[i] if self.times[i] >= 0 else None
+
+def resegment_ocr_results(path: str, confidence_threshold: float = 0.5,
+                          subtitle_disappear_threshold: int = 10) -> CueList:
+    """
+    Rebuild subtitles from saved raw OCR results with new thresholds, without running OCR
+
+    :param path: File written by OcrResultRecorder.save
+    :return: CueList of subtitles, the same as extracting again with these thresholds
+    """
+    recorder = OcrResultRecorder.load(path)
+    # Variable frame rate videos are timed from the timestamps saved with the results
+    tracker = SubtitleTracker(recorder.meta['fps'], confidence_threshold, subtitle_disappear_threshold)
+
+    subtitles = CueList()
+    for i, (frame_index, _, rec_res) in enumerate(recorder):
+        subtitles.extend(tracker.update(frame_index, rec_res, time_ms=recorder.frame_time(i)))
+    subtitles.extend(tracker.finish())
+    return subtitles
@@ -0,0 +1,140 @@
+import cv2
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .stats import NULL_STATS, ExtractionStats
+
+# Extractor of the current worker process, loaded once by _init_worker
+_worker_extractor = None
+
+def _init_worker(extractor_kwargs: Dict) -> None:
+    global _worker_extractor
+    from .subtitle_extractor import VideoSubtitleExtractor
+    _worker_extractor = VideoSubtitleExtractor(**extractor_kwargs)
+
+def _process_segment(video_path: str, start_frame: int, end_frame: int, frame_skip: int,
+                     sampling: str, skip_unchanged: bool, batch_size: int,
+                     subtitle_region: Optional[Tuple], total_frames: int = 0,
+                     record_times: bool = False) -> Tuple[List[Tuple[int, Optional[int], Optional[list],
+                                                                     Optional[list]]], ExtractionStats]:
+    """
+    OCR the sampled frames of one segment in a worker process
+
+    :param total_frames: Frame count of the video, for the sampler
+    :param record_times: Return the timestamp of each frame, for variable frame rate videos
+    :return: Tuple of (list of (frame_index, time_ms, dt_boxes, rec_res) in frame order, stats of the
+        segment), time_ms None unless `record_times`
+    """
+    extractor = _worker_extractor
+    extractor.change_detector.reset()
+    stats = ExtractionStats()
+    extractor._attach_stats(stats)
+    if subtitle_region is not None:
+        extractor._set_subtitle_region(*subtitle_region)
+
+    cap = cv2.VideoCapture(video_path)
+    frame_times = {} if record_times else None
+    try:
+        sampler = extractor._make_sampler(cap, frame_skip, total_frames, sampling=sampling,
+                                          start_frame=start_frame, end_frame=end_frame,
+                                          frame_times=frame_times)
+        results = [
+            (frame_index, frame_times.pop(frame_index, None) if record_times else None, dt_boxes, rec_res)
+            for frame_index, dt_boxes, rec_res in extractor._iter_ocr_results(stats.timed_iter("decode", sampler),
+                                                                       skip_unchanged, batch_size)
+        ]
+    finally:
+        cap.release()
+        extractor._attach_stats(NULL_STATS)
+    stats.finish()
+    return results, stats
+
+def split_segments(total_frames: int, frame_skip: int, segments: int,
+                   start_frame: int = 0) -> List[Tuple[int, int]]:
+    """
+    Split a video (from `start_frame` on) into contiguous frame ranges holding the same number of sampled frames
+
+    Boundaries are placed on sampled frames, so every frame the serial run would
+    sample is sampled by exactly one segment.
+
+    :return: List of (start_frame, end_frame) with end_frame exclusive
+    """
+    first_sample = -(-start_frame // frame_skip)
+    samples = max(0, -(-total_frames // frame_skip) - first_sample)
+    segments = max(1, min(segments, samples))
+    bounds = [(first_sample + round(i * samples / segments)) * frame_skip for i in range(segments + 1)]
+    bounds[-1] = total_frames
+    return [(bounds[i], bounds[i + 1]) for i in range(segments) if bounds[i] < bounds[i + 1]]
+
+def iter_parallel_ocr_results(video_path: str, total_frames: int, frame_skip: int,
+                              extractor_kwargs: Dict, workers: int,
+                              segments: Optional[int] = None,
+                              sampling: str = "auto", skip_unchanged: bool = True,
+                              batch_size: int = 1,
+                              progress_bar=None,
+                              start_frame: int = 0,
+                              subtitle_region: Optional[Tuple] = None,
+                              stats: ExtractionStats = NULL_STATS,
+                              frame_times: Optional[Dict[int, int]] = None) -> Iterator[Tuple[int, Optional[list], Optional[list]]]:
+    """
+    OCR a video with one worker process per segment and yield the results in frame order
+
+    Each worker loads its own OCR models once and handles several segments.
+    Workers only return raw per-frame OCR results; the caller runs them through a
+    single SubtitleTracker, so cues spanning a segment boundary are stitched
+    exactly as in a serial run.
+
+    :param extractor_kwargs: Arguments for the VideoSubtitleExtractor of each worker
+    :param workers: Number of worker processes
+    :param segments: Number of segments, defaults to 4 per worker for load balancing
+    :param start_frame: First frame to process, when resuming
+    :param subtitle_region: (roi, filter_kwargs) for the workers' OCR, e.g. from calibration
+    :param stats: ExtractionStats the measurements of the workers are merged into
+    :param frame_times: Filled with the timestamp of each yielded frame before it is yielded,
+        for variable frame rate videos
+    :return: Iterator of (frame_index, dt_boxes, rec_res)
+    """
+    workers = max(1, min(workers, os.cpu_count() or 1))
+    ranges = split_segments(total_frames, frame_skip, segments or workers * 4, start_frame)
+    if not ranges:
+        return
+
+    # Paddle does not survive fork well, always start fresh interpreters
+    context = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                   initializer=_init_worker, initargs=(extractor_kwargs,))
+    futures, completed_all = {}, False
+    try:
+        futures = {
+            executor.submit(_process_segment, video_path, start, end, frame_skip,
+                            sampling, skip_unchanged, batch_size, subtitle_region, total_frames,
+                            frame_times is not None): i
+            for i, (start, end) in enumerate(ranges)
+        }
+
+        # Yield segments in order as soon as all the previous ones are done
+        done = {}
+        next_segment = 0
+        for completed, future in enumerate(as_completed(futures), 1):
+            done[futures[future]], segment_stats = future.result()
+            stats.merge(segment_stats)
+            if progress_bar:
+                progress_bar.progress(int(completed / len(ranges) * 100))
+            while next_segment in done:
+                for frame_index, time_ms, dt_boxes, rec_res in done.pop(next_segment):
+                    if frame_times is not None and time_ms is not None:
+                        frame_times[frame_index] = time_ms
+                    yield frame_index, dt_boxes, rec_res
+                next_segment += 1
+        completed_all = True
+    finally:
+        if completed_all:
+            executor.shutdown()
+        else:
+            # Closed early or failed: drop the queued segments instead of waiting for the whole video.
+            # Cancelled one by one, shutdown(cancel_futures=True) needs Python 3.9
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
@@ -0,0 +1,130 @@
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .stats import NULL_STATS, ExtractionStats
+
+# Marks the end of the decoded stream in the frame queue
+_DONE = object()
+
+class _WorkerError:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+class OcrPipeline:
+    """
+    Staged producer-consumer pipeline running decode and OCR concurrently
+
+    - a decoder thread pulls sampled frames, applies the change gate and puts
+      them into a bounded frame queue
+    - one OCR worker thread per TextOcr instance consumes that queue
+    - the calling thread collects results, restores frame order and yields them
+
+    Both queues are bounded by `queue_size`, so a slow OCR stage blocks the
+    decoder instead of piling decoded frames up in memory. OpenCV decoding and
+    Paddle inference release the GIL, so the stages really overlap.
+    """
+
+    def __init__(self, text_ocrs: List, queue_size: int = 8) -> None:
+        """
+        :param text_ocrs: One TextOcr instance per OCR worker, predictors are not shared between threads
+        :param queue_size: Maximum number of frames waiting in each queue
+        """
+        self.text_ocrs = text_ocrs
+        self.queue_size = max(1, queue_size)
+
+    def run(self, frames: Iterable[Tuple[int, np.ndarray]],
+            is_unchanged: Optional[Callable[[np.ndarray], bool]] = None,
+            stats: ExtractionStats = NULL_STATS) -> Iterator[Tuple[int, Optional[list], Optional[list]]]:
+        """
+        OCR the frames and yield the results in frame order
+
+        :param frames: Iterator of (frame_index, frame), typically a FrameSampler
+        :param is_unchanged: Change gate called on each frame in decode order, frames
+            for which it returns True get the result of the last OCR'd frame
+        :param stats: ExtractionStats counting frames_sampled, frames_gated and frames_ocr
+        :return: Iterator of (frame_index, dt_boxes, rec_res)
+        """
+        frame_queue = queue.Queue(maxsize=self.queue_size)
+        result_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        def put(q, item) -> bool:
+            # Blocking put that gives up once the pipeline is torn down
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def decode() -> None:
+            try:
+                for seq, (frame_index, frame) in enumerate(frames):
+                    stats.count("frames_sampled")
+                    if is_unchanged is not None and is_unchanged(frame):
+                        frame = None
+                    stats.count("frames_gated" if frame is None else "frames_ocr")
+                    if not put(frame_queue, (seq, frame_index, frame)):
+                        return
+            except BaseException as e:
+                put(result_queue, _WorkerError(e))
+            finally:
+                for _ in self.text_ocrs:
+                    put(frame_queue, _DONE)
+
+        def recognize(text_ocr) -> None:
+            try:
+                while not stop.is_set():
+                    try:
+                        item = frame_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if item is _DONE:
+                        break
+                    seq, frame_index, frame = item
+                    result = text_ocr(frame) if frame is not None else None
+                    if not put(result_queue, (seq, frame_index, result)):
+                        return
+            except BaseException as e:
+                put(result_queue, _WorkerError(e))
+            finally:
+                put(result_queue, _DONE)
+
+        threads = [threading.Thread(target=decode, name="subtitle-decoder", daemon=True)]
+        threads += [
+            threading.Thread(target=recognize, args=(text_ocr,), name=f"subtitle-ocr-{i}", daemon=True)
+            for i, text_ocr in enumerate(self.text_ocrs)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            # Ordered collector: buffer out-of-order results until their turn comes
+            reorder = {}
+            next_seq = 0
+            last_result = (None, None)
+            running = len(self.text_ocrs)
+            while running:
+                item = result_queue.get()
+                if item is _DONE:
+                    running -= 1
+                    continue
+                if isinstance(item, _WorkerError):
+                    raise item.error
+
+                seq, frame_index, result = item
+                reorder[seq] = (frame_index, result)
+                while next_seq in reorder:
+                    frame_index, result = reorder.pop(next_seq)
+                    if result is not None:
+                        last_result = result
+                    yield (frame_index,) + tuple(last_result)
+                    next_seq += 1
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
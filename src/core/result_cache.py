@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+from .cues import CueList
+from .video_metadata import probe_video
+
+# Number and size of the byte ranges hashed to fingerprint a video
+FINGERPRINT_RANGES = 16
+FINGERPRINT_RANGE_SIZE = 64 * 1024
+
+def default_cache_dir() -> str:
+    return os.environ.get(
+        'SUBTITLE_CACHE_DIR',
+        os.path.join(os.path.expanduser('~'), '.cache', 'subtitle-extractor')
+    )
+
+def video_fingerprint(video_path: str) -> str:
+    """
+    Fast content fingerprint of a video file
+
+    Combines the file size, the container duration and a hash of evenly spaced
+    byte ranges, so renamed or copied files still match while re-encoded ones do
+    not. Only about 1 MB of the file is read whatever its size.
+    """
+    size = os.path.getsize(video_path)
+
+    metadata = probe_video(video_path)
+    duration = round(metadata['duration'], 3) if metadata else 0.0
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{size}:{duration}".encode())
+    with open(video_path, 'rb') as f:
+        step = max(0, size - FINGERPRINT_RANGE_SIZE) / max(1, FINGERPRINT_RANGES - 1)
+        for i in range(FINGERPRINT_RANGES):
+            f.seek(int(i * step))
+            digest.update(f.read(FINGERPRINT_RANGE_SIZE))
+    return digest.hexdigest()
+
+class ResultCache:
+    """
+    On-disk cache of extracted subtitles keyed by video content, models and settings
+
+    Each entry is a small JSON file named after the key. Reading an entry bumps
+    its modification time, and the least recently used entries are removed once
+    the cache grows over `max_size_mb`.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_mb: float = 256) -> None:
+        """
+        :param cache_dir: Directory of the cache, defaults to $SUBTITLE_CACHE_DIR or ~/.cache/subtitle-extractor
+        :param max_size_mb: Maximum total size of the cached entries
+        """
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, video_path: str, model_identity: Dict, params: Dict) -> str:
+        """
+        Cache key of a video processed with the given models and extraction parameters
+        """
+        payload = json.dumps(
+            {'video': video_fingerprint(video_path), 'model': model_identity, 'params': params},
+            sort_keys=True
+        )
+        return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[CueList]:
+        """
+        Cached subtitles for a key, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                subtitles = CueList.from_compact(json.load(f)['cues'])
+            os.utime(path)  # Mark as recently used
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return subtitles
+
+    def put(self, key: str, subtitles: CueList) -> None:
+        """
+        Store subtitles atomically and evict old entries if the cache is too big
+        """
+        fd, tmp_path = tempfile.mkstemp(prefix=".entry-", suffix=".tmp", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'cues': subtitles.to_compact()}, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_size:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+                total -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self.cache_dir, name))
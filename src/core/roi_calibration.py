@@ -0,0 +1,88 @@
+import cv2
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+def calibrate_subtitle_roi(text_ocr, cap: cv2.VideoCapture, total_frames: int,
+                           samples: int = 36, min_confidence: float = 0.6,
+                           min_boxes: int = 5, bins: int = 40,
+                           margin_ratio: float = 0.02,
+                           extra_lines: int = 2) -> Optional[Tuple[Tuple[float, float, float, float], Dict]]:
+    """
+    Find the subtitle band of a video from a spread of warm-up frames
+
+    OCRs `samples` frames evenly spread over the video on the full frame, keeps
+    the confidently recognized lines of subtitle-like size, and builds a histogram
+    of their vertical centers. The densest cluster of the histogram is taken as
+    the subtitle position, wherever it is (bottom, top, above a letterbox), and
+    the vertical extent of its boxes gives a tight band. The band keeps the full
+    frame width, since a later line can be longer than any line sampled.
+
+    :param text_ocr: TextOcr to run, its ROI and filter settings are left untouched
+    :param cap: Opened video capture, rewound to the first frame afterwards
+    :param total_frames: Number of frames in the video
+    :param extra_lines: Line heights the band is extended upwards by. Bottom-anchored subtitles grow
+        upwards, and the upper line of two-line cues may be missing from the samples
+    :return: Tuple of (roi ratios, filter_center_bottom_bboxes overrides), or None
+        when too few subtitle lines were found to be confident about the band
+    """
+    if total_frames <= 0:
+        return None
+
+    saved_roi, saved_filter = text_ocr.roi, text_ocr.filter_kwargs
+    # Full frame detection, filtering on size only
+    text_ocr.roi = None
+    text_ocr.filter_kwargs = {'vertical_ratio': 0.0, 'max_vertical_ratio': 1.0}
+
+    boxes = []  # (top, bottom, center_y) ratios
+    try:
+        # Skip the very start and end, where titles and credits live
+        for index in np.linspace(total_frames * 0.05, total_frames * 0.95, samples).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            success, frame = cap.read()
+            if not success:
+                continue
+
+            h = frame.shape[0]
+            dt_boxes, rec_res = text_ocr(frame)
+            for box, (text, conf) in zip(dt_boxes or [], rec_res or []):
+                if conf < min_confidence or not text.strip():
+                    continue
+                ys = box[:, 1] / h
+                boxes.append((ys.min(), ys.max(), ys.mean()))
+    finally:
+        text_ocr.roi, text_ocr.filter_kwargs = saved_roi, saved_filter
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    if len(boxes) < min_boxes:
+        return None
+
+    boxes = np.array(boxes)
+    counts, edges = np.histogram(boxes[:, 2], bins=bins, range=(0.0, 1.0))
+
+    # Grow the densest bin into its cluster of populated neighbours
+    peak = int(np.argmax(counts))
+    floor = max(1, counts[peak] * 0.1)
+    low, high = peak, peak
+    while low > 0 and counts[low - 1] >= floor:
+        low -= 1
+    while high < bins - 1 and counts[high + 1] >= floor:
+        high += 1
+
+    in_band = (boxes[:, 2] >= edges[low]) & (boxes[:, 2] <= edges[high + 1])
+    if in_band.sum() < min_boxes:
+        return None
+    band = boxes[in_band]
+    # Room for the lines above the sampled ones, one line being about 1.2 box heights
+    headroom = extra_lines * 1.2 * float(np.median(band[:, 1] - band[:, 0]))
+
+    roi = (
+        max(0.0, band[:, 0].min() - headroom - margin_ratio),
+        min(1.0, band[:, 1].max() + margin_ratio),
+        0.0,
+        1.0,
+    )
+    filter_kwargs = {
+        'vertical_ratio': max(0.0, edges[low] - headroom - margin_ratio),
+        'max_vertical_ratio': min(1.0, edges[high + 1] + margin_ratio),
+    }
+    return tuple(float(v) for v in roi), {k: float(v) for k, v in filter_kwargs.items()}
@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+class ExtractionStats:
+    """
+    Per-stage timers, counters and histograms of one extraction
+
+    Stages used by the extractor:
+
+    - decode: reading sampled frames, including grabbing or seeking over the others
+    - gate: change detection on the subtitle band
+    - det, crop, rec: text detection, line cropping and recognition in TextOcr
+    - track: subtitle state machine, of which dedup is the duplicate check
+
+    Counters include frames_sampled / frames_gated / frames_ocr for the change
+    gate and the decoder work of FrameSampler (frames_decoded and the rest).
+
+    Timers keep every duration (up to `max_samples` per stage) for percentiles.
+    With `trace=True` each timed section is also kept as an event, to be saved
+    with save_trace and opened in chrome://tracing or Perfetto. Safe to use
+    from the pipeline threads.
+    """
+
+    def __init__(self, trace: bool = False, max_samples: int = 100000) -> None:
+        """
+        :param trace: Record an event per timed section for save_trace
+        :param max_samples: Durations and values kept per timer or histogram, and events kept in total
+        """
+        self.trace = trace
+        self.max_samples = max_samples
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.timers: Dict[str, List[float]] = {}
+        self.timer_totals: Dict[str, List[float]] = {}  # name -> [total seconds, calls]
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, List[float]] = {}
+        self.events: List[tuple] = []  # (name, start, duration, thread name)
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add_time(self, name: str, seconds: float, start: Optional[float] = None) -> None:
+        """
+        Record a duration of a stage, `start` being its perf_counter start for the trace
+        """
+        with self._lock:
+            totals = self.timer_totals.setdefault(name, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+            samples = self.timers.setdefault(name, [])
+            if len(samples) < self.max_samples:
+                samples.append(seconds)
+            if self.trace and start is not None and len(self.events) < self.max_samples:
+                self.events.append((name, start, seconds, threading.current_thread().name))
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start, start)
+
+    def timed_iter(self, name: str, iterable: Iterable) -> Iterator:
+        """
+        Iterate, timing every step under `name`, e.g. frame decoding of a sampler
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.add_time(name, time.perf_counter() - start, start)
+            yield item
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, value: float) -> None:
+        """
+        Add a value to a histogram, e.g. the number of boxes of a frame
+        """
+        with self._lock:
+            values = self.histograms.setdefault(name, [])
+            if len(values) < self.max_samples:
+                values.append(value)
+
+    def finish(self) -> None:
+        """Mark the end of the extraction, for the wall time"""
+        self.finished = time.perf_counter()
+
+    def merge(self, other: "ExtractionStats") -> None:
+        """
+        Add the measurements of another instance, e.g. from a parallel worker process
+
+        Trace events of other processes are not merged, their clocks differ.
+        """
+        with self._lock:
+            for name, (total, calls) in other.timer_totals.items():
+                totals = self.timer_totals.setdefault(name, [0.0, 0])
+                totals[0] += total
+                totals[1] += calls
+            for name, samples in other.timers.items():
+                kept = self.timers.setdefault(name, [])
+                kept.extend(samples[:max(0, self.max_samples - len(kept))])
+            for name, n in other.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            for name, values in other.histograms.items():
+                kept = self.histograms.setdefault(name, [])
+                kept.extend(values[:max(0, self.max_samples - len(kept))])
+
+    @property
+    def wall_time(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self) -> Dict:
+        """
+        Totals, shares of the wall time and percentiles of every stage, plus counters and histograms
+
+        Stages may overlap (pipeline threads, parallel workers, dedup within
+        track), so shares do not need to add up to 1.
+        """
+        wall = self.wall_time
+        with self._lock:
+            timers = {}
+            for name, (total, calls) in sorted(self.timer_totals.items()):
+                samples = np.asarray(self.timers.get(name) or [0.0]) * 1000
+                timers[name] = {
+                    'total': round(total, 4),
+                    'calls': calls,
+                    'share': round(total / wall, 4) if wall else None,
+                    'mean_ms': round(total * 1000 / calls, 3) if calls else None,
+                    'p50_ms': round(float(np.percentile(samples, 50)), 3),
+                    'p95_ms': round(float(np.percentile(samples, 95)), 3),
+                    'max_ms': round(float(samples.max()), 3),
+                }
+            histograms = {}
+            for name, values in sorted(self.histograms.items()):
+                values = np.asarray(values or [0.0], dtype=np.float64)
+                histograms[name] = {
+                    'count': len(self.histograms[name]),
+                    'min': float(values.min()),
+                    'mean': round(float(values.mean()), 3),
+                    'p50': float(np.percentile(values, 50)),
+                    'p95': float(np.percentile(values, 95)),
+                    'max': float(values.max()),
+                }
+            counters = dict(sorted(self.counters.items()))
+        return {'wall_time': round(wall, 4), 'timers': timers, 'counters': counters, 'histograms': histograms}
+
+    def save_json(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def save_trace(self, path: str) -> None:
+        """
+        Write the recorded events in the Chrome trace event format
+        """
+        with self._lock:
+            events = list(self.events)
+        threads = {}
+        trace_events = []
+        for name, start, duration, thread in events:
+            tid = threads.setdefault(thread, len(threads) + 1)
+            trace_events.append({
+                'name': name, 'cat': 'extraction', 'ph': 'X', 'pid': os.getpid(), 'tid': tid,
+                'ts': round((start - self.started) * 1e6, 1), 'dur': round(duration * 1e6, 1),
+            })
+        for thread, tid in threads.items():
+            trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid,
+                                 'args': {'name': thread}})
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': trace_events, 'otherData': self.summary()}, f)
+
+class NullStats(ExtractionStats):
+    """
+    Stand-in recording nothing, used when no stats were asked for
+    """
+
+    def add_time(self, name: str, seconds: float, start: Optional[float] = None) -> None:
+        pass
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        yield
+
+    def timed_iter(self, name: str, iterable: Iterable) -> Iterator:
+        return iter(iterable)
+
+    def count(self, name: str, n: int = 1) -> None:
+        pass
+
+    def observe(self, name: str, value: float) -> None:
+        pass
+
+    def merge(self, other: ExtractionStats) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+NULL_STATS = NullStats()
@@ -1,30 +1,63 @@
 import cv2
-import difflib
 import os
-import re
+import time
 
-from utils import init_args
-from .text_ocr import TextOcr
-from typing import List, Optional, Dict
+from .model_registry import ModelRegistry, default_registry
+from .frame_sampler import FrameSampler, AdaptiveFrameSampler
+from .change_detector import SubtitleChangeDetector
+from .subtitle_tracker import SubtitleTracker
+from .parallel import iter_parallel_ocr_results
+from .pipeline import OcrPipeline
+from .checkpoint import video_identity, save_checkpoint, load_checkpoint, remove_checkpoint
+from .result_cache import ResultCache
+from .ocr_store import OcrResultRecorder
+from .roi_calibration import calibrate_subtitle_roi
+from .stats import NULL_STATS, ExtractionStats
+from .cues import Cue, CueList
+from .video_metadata import probe_video
+from .writers import write_through
+from utils import get_language_paths
+from typing import Iterator, List, Optional, Dict, Sequence, Tuple, Union
 
 class VideoSubtitleExtractor:
-    def __init__(self, lang: str = "en", use_gpu: bool = False) -> None:
+    def __init__(self, lang: Union[str, List[str]] = "en", use_gpu: bool = False, use_roi: bool = True,
+                 registry: Optional[ModelRegistry] = None, rec_mode: str = "position",
+                 result_cache: Optional[ResultCache] = None) -> None:
         """
         Initialize video subtitle extractor with memory-efficient processing
         
-        :param lang: Language code for subtitle extraction
+        :param lang: Language code for subtitle extraction, or a list of codes for bilingual
+            subtitles, which detects once per frame and routes each line to its recognizer
+        :param use_roi: Crop frames to the subtitle band before text detection
+        :param registry: Model cache to take the OCR models from, defaults to the process-wide one
+        :param rec_mode: Line routing for bilingual subtitles ("position" or "confidence"), see MultiLangTextOcr
+        :param result_cache: Cache returning the subtitles of videos already processed with the same settings
         """
-        self.args = init_args(lang, use_gpu)
+        # Kept to build identical extractors in worker processes
+        self.extractor_kwargs = {'lang': lang, 'use_gpu': use_gpu, 'use_roi': use_roi, 'rec_mode': rec_mode}
+
+        # Loaded models are shared by every extractor of the process
+        self.text_sys = (registry or default_registry).get_text_ocr(lang, use_gpu, rec_mode)
+        self.args = self.text_sys.args
         self.args.warmup = True
+        if not use_roi:
+            self.args.subtitle_roi = None
+            self.text_sys.roi = None
         
-        self.text_sys = TextOcr(self.args)
-        self.previous_subtitles = []
+        self.result_cache = result_cache
+        self.default_roi = self.text_sys.roi
+        self.pipeline_ocrs = [self.text_sys]  # One TextOcr per pipeline OCR worker, grown on demand
+        self.change_detector = SubtitleChangeDetector()
+        self.stats = NULL_STATS  # ExtractionStats of the running extraction
         self.line_separator = " | "  # Separator for multiple lines in output
 
     def extract_subtitles(self, video_path: str, frame_rate: int = 1, 
                            confidence_threshold: float = 0.5, 
                            subtitle_disappear_threshold: int = 10,  # Increased threshold
-                           progress_bar=None) -> List[Dict]:
+                           progress_bar=None, return_stats: bool = False,
+                           trace_path: Optional[str] = None,
+                           writers: Optional[Sequence] = None,
+                           **kwargs) -> Union[CueList, Tuple[CueList, ExtractionStats]]:
         """
         Extract subtitles from video with precise timing and memory efficiency
         
@@ -33,189 +66,393 @@ class VideoSubtitleExtractor:
         :param confidence_threshold: Minimum confidence for subtitle recognition
         :param subtitle_disappear_threshold: Number of consecutive frames without subtitle
         :param progress_bar: Streamlit progress bar object
-        :return: List of extracted subtitles with precise timestamps
+        :param return_stats: Also return the ExtractionStats of the run, see core.stats
+        :param trace_path: File to save a Chrome trace of the run to
+        :param writers: Subtitle writers (see core.writers) every cue is streamed to as soon as it is
+            final, closed when the video is done
+        :param kwargs: Performance options of iter_subtitles
+        :return: CueList of extracted subtitles with precise timestamps,
+            or a tuple of (subtitles, stats) with return_stats
+        """
+        stats = ExtractionStats(trace=trace_path is not None) if return_stats or trace_path else None
+        cues = self.iter_subtitles(
+            video_path, frame_rate, confidence_threshold, subtitle_disappear_threshold,
+            progress_bar=progress_bar, stats=stats, **kwargs
+        )
+        subtitles = CueList(write_through(cues, writers) if writers else cues)
+        if trace_path:
+            stats.save_trace(trace_path)
+        return (subtitles, stats) if return_stats else subtitles
+
+    def iter_subtitles(self, video_path: str, frame_rate: int = 1, 
+                       confidence_threshold: float = 0.5, 
+                       subtitle_disappear_threshold: int = 10,  # Increased threshold
+                       progress_bar=None,
+                       sampling: str = "auto",
+                       skip_unchanged: bool = True,
+                       batch_size: int = 1,
+                       workers: int = 1,
+                       pipeline: bool = False,
+                       ocr_workers: int = 1,
+                       queue_size: int = 8,
+                       checkpoint_path: Optional[str] = None,
+                       checkpoint_interval: float = 60.0,
+                       resume: bool = False,
+                       use_cache: bool = True,
+                       raw_results_path: Optional[str] = None,
+                       calibrate_roi: bool = False,
+                       stats: Optional[ExtractionStats] = None) -> Iterator[Cue]:
         """
+        Extract subtitles from video, yielding each one as soon as its end time is known
+
+        Nothing is accumulated, so callers can show or persist cues while a long
+        video is still being processed.
+        
+        :param video_path: Path to the video file
+        :param frame_rate: Number of frames to skip between each processed frame
+        :param confidence_threshold: Minimum confidence for subtitle recognition
+        :param subtitle_disappear_threshold: Number of consecutive frames without subtitle
+        :param progress_bar: Streamlit progress bar object
+        :param sampling: Frame sampling strategy ("auto", "grab" or "seek", see FrameSampler), or "adaptive"
+            to scan every frame_skip frames and bisect to the exact frame where the subtitle band changes
+        :param skip_unchanged: Reuse the previous OCR result while the subtitle band does not change,
+            hit counters are available in `self.change_detector.stats`. Changes are detected on bright,
+            outlined text, other styles are only picked up by the periodic refresh of the gate
+            (see SubtitleChangeDetector refresh_interval)
+        :param batch_size: Number of sampled frames whose crops are recognized in one batch
+        :param workers: Number of worker processes, each OCRing its own segments of the video
+        :param pipeline: Decode in a background thread and OCR in worker threads, see OcrPipeline
+        :param ocr_workers: Number of OCR worker threads in pipeline mode, each loads its own models
+        :param queue_size: Maximum number of decoded frames waiting for OCR in pipeline mode
+        :param checkpoint_path: File to periodically save progress to, see core.checkpoint.checkpoint_path_for.
+            It is removed once the video is done
+        :param checkpoint_interval: Minimum number of seconds between two checkpoints
+        :param resume: Continue from the checkpoint if it matches this video and these parameters,
+            the subtitles found before it are yielded first
+        :param use_cache: Look the video up in (and store it to) the extractor's result cache
+        :param raw_results_path: .npz file to save the raw OCR result of every sampled frame to,
+            for re-segmenting with other thresholds through core.ocr_store.resegment_ocr_results
+        :param calibrate_roi: OCR a few dozen frames across the video first to find where its subtitles
+            are, then crop and filter every frame to that band, see calibrate_subtitle_roi
+        :param stats: ExtractionStats to record stage timings and counters into
+        :return: Iterator of extracted subtitles with precise timestamps
+        """
+        # Probed once per file and shared with the result cache and the app
+        metadata = probe_video(video_path) or {'fps': 0.0, 'total_frames': 0, 'vfr': False}
+
+        # Settings the extracted subtitles depend on. batch_size, workers, pipeline, ocr_workers and
+        # queue_size only change the throughput and are left out
+        params = {
+            'frame_rate': frame_rate,
+            'confidence_threshold': confidence_threshold,
+            'subtitle_disappear_threshold': subtitle_disappear_threshold,
+            # Adaptive sampling bisects to the exact change frame, so its cue times differ
+            'sampling': sampling,
+            # Gated frames reuse the previous OCR result
+            'skip_unchanged': skip_unchanged,
+        }
+        if calibrate_roi:
+            params['calibrate_roi'] = True
+        if metadata['vfr']:
+            # Cue times come from the frame timestamps instead of frame index / fps
+            params['timestamps'] = 'pts'
+
+        # Videos already processed with the same models and settings come straight from the cache
+        cache_key = None
+        if use_cache and self.result_cache is not None and not raw_results_path:
+            cache_key = self.result_cache.make_key(video_path, self.model_identity(), params)
+            cached = self.result_cache.get(cache_key)
+            if stats is not None:
+                stats.count("cache_hits" if cached is not None else "cache_misses")
+            if cached is not None:
+                if stats is not None:
+                    stats.finish()
+                if progress_bar:
+                    progress_bar.progress(100)
+                yield from cached
+                return
+
+        # Variable frame rate videos are timed from the position of each decoded frame,
+        # filled in by the sampler and taken out as results come
+        frame_times = {} if metadata['vfr'] else None
+
         # Open video capture
         cap = cv2.VideoCapture(video_path)
         
         # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = metadata['fps']
+        total_frames = metadata['total_frames']
         
         # Calculate frame skip
         frame_skip = max(1, int(fps // frame_rate))
         
-        # Subtitle tracking variables
-        subtitles = []
-        current_subtitle = None
-        frames_without_subtitle = 0
-        frame_count = 0
-        last_subtitle_frame = -1
-        last_valid_subtitle_frame = -1
+        stats = stats if stats is not None else NULL_STATS
+        tracker = SubtitleTracker(fps, confidence_threshold, subtitle_disappear_threshold, stats=stats)
+        last_progress = -1
+        self.change_detector.reset()
+        self._set_subtitle_region(self.default_roi, {})
+        if calibrate_roi and self.default_roi is not None:
+            with stats.timer("calibrate"):
+                region = calibrate_subtitle_roi(self.text_sys, cap, total_frames)
+            if region:
+                self._set_subtitle_region(*region)
+        recorder = None
+        if raw_results_path:
+            recorder = OcrResultRecorder({'fps': fps, 'frame_skip': frame_skip, 'total_frames': total_frames,
+                                          'video_path': os.path.abspath(video_path),
+                                          'vfr': metadata['vfr']})
 
+        # Checkpointing and caching keep the subtitles found so far to write them out
+        collect = bool(checkpoint_path) or cache_key is not None
+        start_frame = 0
+        emitted = CueList()
+        if checkpoint_path:
+            video = video_identity(video_path)
+            checkpoint_params = dict(params, extractor=self.extractor_kwargs)
+            state = load_checkpoint(checkpoint_path, video, checkpoint_params) if resume else None
+            if state:
+                tracker.set_state(state['tracker'])
+                start_frame = state['next_frame']
+                emitted = CueList.from_compact(state['subtitles'])
+                if recorder is not None and os.path.exists(raw_results_path):
+                    # Keep the raw results of the frames before the checkpoint
+                    previous = OcrResultRecorder.load(raw_results_path)
+                    if previous.meta == recorder.meta:
+                        previous.truncate(start_frame)
+                        recorder = previous
+                yield from emitted
+            last_checkpoint = time.monotonic()
+
+        self._attach_stats(stats)
+        ocr_results = None
         try:
-            while True:
-                # Read frame
-                success, frame = cap.read()
-                
-                # Break if no more frames
-                if not success:
-                    break
-                
-                # Process frame at specified rate
-                if frame_count % frame_skip == 0:
-                    # Perform OCR
-                    _, rec_res = self.text_sys(frame)
-                    
-                    if rec_res:
-                        # Group subtitles from the same frame
-                        frame_subtitles = []
-                        current_group = []
-                        current_confidence = 0.0
-                        
-                        for text, conf in rec_res:
-                            if conf >= confidence_threshold and text.strip():
-                                current_group.append(text.strip())
-                                current_confidence = max(current_confidence, conf)
-                        
-                        if current_group:
-                            # Join multiple lines with newline
-                            combined_text = "\n".join(current_group)
-                            frame_subtitles.append((combined_text, current_confidence))
-                        
-                        if frame_subtitles:
-                            best_subtitle = max(frame_subtitles, key=lambda x: (x[1], len(x[0])))[0]
-                            
-                            # Check subtitle uniqueness
-                            is_unique = all(
-                                self._compute_similarity(best_subtitle, prev) < 0.8 
-                                for prev in self.previous_subtitles[-10:]  # Only compare with last 10 subtitles
-                            )
-                            
-                            if is_unique:
-                                # Close previous subtitle if exists
-                                if current_subtitle:
-                                    current_subtitle['end_time'] = self._format_timestamp(
-                                        last_valid_subtitle_frame / fps
-                                    )
-                                    subtitles.append(current_subtitle)
-                                
-                                # Start new subtitle
-                                current_subtitle = {
-                                    'start_time': self._format_timestamp(frame_count / fps),
-                                    'end_time': None,
-                                    'text': best_subtitle
-                                }
-                                
-                                frames_without_subtitle = 0
-                                # last_subtitle_frame = frame_count
-                                last_valid_subtitle_frame = frame_count
-                                self.previous_subtitles.append(best_subtitle)
-                            
-                            # Update last valid subtitle frame
-                            last_valid_subtitle_frame = frame_count
-                            frames_without_subtitle = 0
-                                
-                    else:
-                        frames_without_subtitle += 1
-                    
-                    # Check if subtitle should be considered disappeared
-                    if current_subtitle and frames_without_subtitle >= subtitle_disappear_threshold:
-                        # Use the last frame where subtitle was definitely visible
-                        current_subtitle['end_time'] = self._format_timestamp(
-                            last_valid_subtitle_frame / fps
-                        )
-                        subtitles.append(current_subtitle)
-                        current_subtitle = None
-                
+            if workers > 1 and total_frames > 0:
+                # Segments are decoded by the workers, the local capture is not needed
+                cap.release()
+                ocr_results = iter_parallel_ocr_results(
+                    video_path, total_frames, frame_skip, self.extractor_kwargs, workers,
+                    sampling=sampling, skip_unchanged=skip_unchanged, batch_size=batch_size,
+                    progress_bar=progress_bar, start_frame=start_frame,
+                    subtitle_region=(self.text_sys.roi, self.text_sys.filter_kwargs),
+                    stats=stats, frame_times=frame_times
+                )
+                progress_bar = None  # Progress is reported per finished segment
+            else:
+                # Only sampled frames are retrieved, the rest are grabbed or seeked over
+                sampler = self._make_sampler(cap, frame_skip, total_frames, sampling, start_frame=start_frame,
+                                             frame_times=frame_times)
+                sampler = stats.timed_iter("decode", sampler)
+                if pipeline:
+                    ocr_results = self._iter_pipelined_ocr_results(sampler, skip_unchanged,
+                                                                   ocr_workers, queue_size)
+                else:
+                    ocr_results = self._iter_ocr_results(sampler, skip_unchanged, batch_size)
+
+            for frame_count, dt_boxes, rec_res in ocr_results:
+                time_ms = frame_times.pop(frame_count, None) if frame_times is not None else None
+                if recorder is not None:
+                    recorder.add(frame_count, dt_boxes, rec_res, time_ms)
+                with stats.timer("track"):
+                    finished = tracker.update(frame_count, rec_res, dt_boxes, time_ms)
+                for subtitle in finished:
+                    stats.count("subtitles")
+                    if collect:
+                        emitted.append(subtitle)
+                    yield subtitle
+
+                if checkpoint_path and time.monotonic() - last_checkpoint >= checkpoint_interval:
+                    # Raw results first, so they always cover the frames the checkpoint does
+                    if recorder is not None:
+                        recorder.save(raw_results_path)
+                    save_checkpoint(checkpoint_path, {
+                        'video': video,
+                        'params': checkpoint_params,
+                        'next_frame': frame_count + 1,
+                        'tracker': tracker.get_state(),
+                        'subtitles': emitted.to_compact(),
+                    })
+                    last_checkpoint = time.monotonic()
+            
                 # Update progress bar
-                if progress_bar and frame_count % max(1, total_frames // 100) == 0:
-                    progress_bar.progress(int(frame_count / total_frames * 100))
-                
-                frame_count += 1
-                
-                # Stop if all frames processed
-                if frame_count >= total_frames:
-                    break
+                if progress_bar and total_frames > 0:
+                    progress = min(100, int(frame_count / total_frames * 100))
+                    if progress != last_progress:
+                        progress_bar.progress(progress)
+                        last_progress = progress
             
             # Handle last subtitle if exists
-            if current_subtitle:
-                current_subtitle['end_time'] = self._format_timestamp(
-                    last_valid_subtitle_frame / fps
-                )
-                subtitles.append(current_subtitle)
+            for subtitle in tracker.finish():
+                stats.count("subtitles")
+                if collect:
+                    emitted.append(subtitle)
+                yield subtitle
+
+            if recorder is not None:
+                recorder.save(raw_results_path)
+
+            # Finished, nothing left to resume
+            if checkpoint_path:
+                remove_checkpoint(checkpoint_path)
+            if cache_key is not None:
+                self.result_cache.put(cache_key, emitted)
         
         finally:
+            # Stop and join the decode/OCR threads or worker processes first, they may still be using cap
+            if ocr_results is not None:
+                ocr_results.close()
             cap.release()
-        
-        return subtitles
+            self._attach_stats(NULL_STATS)
+            stats.finish()
 
-    def _compute_similarity(self, str1: str, str2: str) -> float:
+    def _attach_stats(self, stats: ExtractionStats) -> None:
         """
-        Compute similarity between two strings, handling multiline text
+        Record the stages of the following extraction into stats
         """
-        # Normalize both strings
-        clean_str1 = self._normalize_text(str1)
-        clean_str2 = self._normalize_text(str2)
-        
-        # Remove spaces and convert to lowercase for comparison
-        clean_str1 = clean_str1.replace(' ', '').lower()
-        clean_str2 = clean_str2.replace(' ', '').lower()
-        
-        return difflib.SequenceMatcher(None, clean_str1, clean_str2).ratio()
+        self.stats = stats
+        for text_ocr in self.pipeline_ocrs:
+            text_ocr.stats = stats
 
-    def _normalize_text(self, text: str) -> str:
+    def _set_subtitle_region(self, roi, filter_kwargs: Dict) -> None:
         """
-        Normalize subtitle text by handling multiline and cleaning up spaces
-        
-        :param text: Raw subtitle text
-        :return: Normalized text
+        Use a subtitle band for cropping and box filtering in every OCR instance
         """
-        # Split text by common line separators
-        lines = re.split(r'[\n\r]+', text)
-        
-        # Clean each line
-        cleaned_lines = []
-        for line in lines:
-            # Remove extra spaces and trim
-            line = ' '.join(line.split())
-            if line:
-                cleaned_lines.append(line)
-        
-        # Join lines with newline
-        return "\n".join(cleaned_lines)
+        for text_ocr in self.pipeline_ocrs:
+            text_ocr.roi = roi
+            text_ocr.filter_kwargs = dict(filter_kwargs)
 
-    def _format_timestamp(self, seconds: float) -> str:
+    def _make_sampler(self, cap: cv2.VideoCapture, frame_skip: int, total_frames: int = 0,
+                      sampling: str = "auto", start_frame: int = 0,
+                      end_frame: Optional[int] = None,
+                      frame_times: Optional[Dict[int, int]] = None) -> FrameSampler:
         """
-        Convert seconds to SRT timestamp format
+        Build the frame sampler for a sampling strategy
         """
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = seconds % 60
-        millisecs = int((secs - int(secs)) * 1000)
-        
-        return f"{hours:02d}:{minutes:02d}:{int(secs):02d},{millisecs:03d}"
+        if sampling != "adaptive":
+            return FrameSampler(cap, frame_skip, total_frames, mode=sampling,
+                                start_frame=start_frame, end_frame=end_frame, frame_times=frame_times,
+                                stats=self.stats)
+
+        def fingerprint(frame):
+            top, bottom, left, right = self.text_sys.get_roi_box(*frame.shape[:2])
+            return self.change_detector.fingerprint(frame[top:bottom, left:right])
+
+        return AdaptiveFrameSampler(cap, frame_skip, fingerprint, self.change_detector.changed,
+                                    total_frames, start_frame=start_frame, end_frame=end_frame,
+                                    frame_times=frame_times, stats=self.stats)
+
+    def _iter_ocr_results(self, sampler: FrameSampler, skip_unchanged: bool = True,
+                          batch_size: int = 1) -> Iterator[Tuple[int, Optional[list], Optional[list]]]:
+        """
+        Run OCR over the sampled frames and yield the results in frame order
+
+        Frames whose subtitle band is unchanged are not sent to OCR and get the
+        result of the last frame that was. With batch_size > 1 the frames that do
+        need OCR are collected and recognized together with TextOcr.process_batch.
+
+        :param sampler: Frame sampler over the opened video
+        :param skip_unchanged: Gate OCR with the change detector
+        :param batch_size: Number of frames to OCR per batch
+        :return: Iterator of (frame_index, dt_boxes, rec_res)
+        """
+        batch_size = max(1, batch_size)
+        last_result = (None, None)
+        pending = []  # (frame_index, frame or None when the previous result is reused)
+        pending_frames = 0
+
+        stats = self.stats
+        for frame_index, frame in sampler:
+            stats.count("frames_sampled")
+            top, bottom, left, right = self.text_sys.get_roi_box(*frame.shape[:2])
+            if skip_unchanged:
+                with stats.timer("gate"):
+                    unchanged = self.change_detector.is_unchanged(frame[top:bottom, left:right])
+                if unchanged:
+                    frame = None
+            stats.count("frames_gated" if frame is None else "frames_ocr")
+
+            if batch_size == 1:
+                # Perform OCR unless the subtitle band looks the same as last time
+                if frame is not None:
+                    last_result = self.text_sys(frame)
+                yield (frame_index,) + tuple(last_result)
+                continue
+
+            pending.append((frame_index, frame))
+            if frame is not None:
+                pending_frames += 1
+            if pending_frames >= batch_size:
+                last_result = yield from self._flush_batch(pending, last_result)
+                pending, pending_frames = [], 0
+
+        if pending:
+            yield from self._flush_batch(pending, last_result)
+
+    def _flush_batch(self, pending, last_result):
+        """
+        OCR the pending frames in one batch and yield their results in order
+
+        :return: Result of the last frame in the batch, to be reused by the next ones
+        """
+        results = iter(self.text_sys.process_batch([frame for _, frame in pending if frame is not None]))
+        for frame_index, frame in pending:
+            if frame is not None:
+                last_result = next(results)
+            yield (frame_index,) + tuple(last_result)
+        return last_result
+
+    def _iter_pipelined_ocr_results(self, sampler: FrameSampler, skip_unchanged: bool = True,
+                                    ocr_workers: int = 1,
+                                    queue_size: int = 8) -> Iterator[Tuple[int, Optional[list], Optional[list]]]:
+        """
+        Same as _iter_ocr_results, with decoding and OCR overlapped in threads
+
+        :return: Iterator of (frame_index, dt_boxes, rec_res)
+        """
+        while len(self.pipeline_ocrs) < ocr_workers:
+            # A private registry loads models of its own for each extra worker
+            kwargs = self.extractor_kwargs
+            text_ocr = ModelRegistry().get_text_ocr(kwargs['lang'], kwargs['use_gpu'], kwargs['rec_mode'])
+            text_ocr.roi = self.text_sys.roi
+            text_ocr.filter_kwargs = dict(self.text_sys.filter_kwargs)
+            text_ocr.stats = self.stats
+            self.pipeline_ocrs.append(text_ocr)
+
+        stats = self.stats
+        def is_unchanged(frame):
+            top, bottom, left, right = self.text_sys.get_roi_box(*frame.shape[:2])
+            with stats.timer("gate"):
+                return self.change_detector.is_unchanged(frame[top:bottom, left:right])
+
+        ocr_pipeline = OcrPipeline(self.pipeline_ocrs[:max(1, ocr_workers)], queue_size)
+        return ocr_pipeline.run(sampler, is_unchanged if skip_unchanged else None, stats)
+
+    def model_identity(self) -> Dict:
+        """
+        Identity of the OCR models and settings, results only carry over between equal identities
+        """
+        langs = self.extractor_kwargs['lang']
+        langs = [langs] if isinstance(langs, str) else list(langs)
+        model_dirs = [self.args.det_model_dir] + [get_language_paths(lang)[0] for lang in langs]
+
+        files = {}
+        for model_dir in model_dirs:
+            for name in sorted(os.listdir(model_dir)):
+                stat = os.stat(os.path.join(model_dir, name))
+                files[f"{model_dir}/{name}"] = [stat.st_size, int(stat.st_mtime)]
+
+        return {
+            'langs': langs,
+            'rec_mode': self.extractor_kwargs['rec_mode'],
+            # Not text_sys.roi, which still holds the band calibrated for the previous video
+            'roi': list(self.default_roi) if self.default_roi else None,
+            'files': files,
+        }
 
     def get_video_metadata(self, video_path: str) -> Optional[dict]:
         """
-        Get video metadata efficiently
+        Get video metadata efficiently, probed once per file, see core.video_metadata
         
         :param video_path: Path to the input video file
         :return: Dictionary with video metadata or None
         """
-        try:
-            cap = cv2.VideoCapture(video_path)
-            
-            metadata = {
-                'fps': cap.get(cv2.CAP_PROP_FPS),
-                'total_frames': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
-                'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
-                'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
-                'duration': cap.get(cv2.CAP_PROP_FRAME_COUNT) / cap.get(cv2.CAP_PROP_FPS)
-            }
-            
-            return metadata
-        except Exception as e:
-            return None
-        finally:
-            cap.release()
\ No newline at end of file
+        return probe_video(video_path)
@@ -0,0 +1,174 @@
+from typing import Dict, List, Optional
+
+from utils import box_rows
+
+from .cues import Cue
+from .dedup import DedupWindow
+from .stats import NULL_STATS, ExtractionStats
+
+class SubtitleTracker:
+    """
+    Subtitle state machine turning per-frame OCR results into timed cues
+
+    Feed it the OCR result of every sampled frame in frame order with `update`
+    and call `finish` at the end of the video. Both return the cues that got
+    finalized by that call, as Cue objects with millisecond times.
+    """
+
+    def __init__(self, fps: float, confidence_threshold: float = 0.5,
+                 subtitle_disappear_threshold: int = 10,
+                 dedup: Optional[DedupWindow] = None,
+                 stats: Optional[ExtractionStats] = None) -> None:
+        """
+        :param fps: Frame rate used to convert frame indices to timestamps
+        :param confidence_threshold: Minimum confidence for subtitle recognition
+        :param subtitle_disappear_threshold: Number of consecutive sampled frames without subtitle
+        :param dedup: Window of recent subtitles used for deduplication, a fresh one by default
+        :param stats: ExtractionStats to time the duplicate checks into
+        """
+        self.fps = fps
+        self.confidence_threshold = confidence_threshold
+        self.subtitle_disappear_threshold = subtitle_disappear_threshold
+        self.dedup = dedup if dedup is not None else DedupWindow()
+        self.stats = stats if stats is not None else NULL_STATS
+
+        # Subtitle tracking variables
+        self.current_subtitle = None
+        self.frames_without_subtitle = 0
+        self.last_valid_subtitle_frame = -1
+        self.last_valid_subtitle_ms = 0
+
+    def update(self, frame_count: int, rec_res, dt_boxes=None, time_ms: Optional[int] = None) -> List[Cue]:
+        """
+        Process the OCR result of one sampled frame
+
+        :param frame_count: Index of the frame in the video
+        :param rec_res: List of (text, confidence) recognized in the frame, or None
+        :param dt_boxes: Boxes of the recognized lines, aligned with rec_res, for the cue box
+        :param time_ms: Presentation time of the frame, for variable frame rate videos where
+            frame index / fps drifts, see FrameSampler frame_times
+        :return: Subtitles finalized by this frame
+        """
+        finished = []
+        if rec_res:
+            # Group subtitles from the same frame
+            frame_subtitles = []
+            current_group = []
+            current_boxes = []
+            current_confidence = 0.0
+
+            # Boxes on the same row are one line, otherwise every box is
+            if dt_boxes is not None and len(dt_boxes) == len(rec_res):
+                rows = box_rows(dt_boxes)
+            else:
+                rows = [[i] for i in range(len(rec_res))]
+            for row in rows:
+                line = []
+                for i in row:
+                    text, conf = rec_res[i]
+                    if conf >= self.confidence_threshold and text.strip():
+                        line.append(text.strip())
+                        current_confidence = max(current_confidence, conf)
+                        if dt_boxes is not None:
+                            current_boxes.append(dt_boxes[i])
+                if line:
+                    current_group.append(" ".join(line))
+
+            if current_group:
+                # Join multiple lines with newline
+                combined_text = "\n".join(current_group)
+                frame_subtitles.append((combined_text, current_confidence, current_boxes))
+
+            if frame_subtitles:
+                best_subtitle, best_confidence, best_boxes = max(frame_subtitles, key=lambda x: (x[1], len(x[0])))
+
+                # Check subtitle uniqueness against the last few subtitles
+                with self.stats.timer("dedup"):
+                    is_duplicate = self.dedup.is_duplicate(best_subtitle)
+                if not is_duplicate:
+                    # Close previous subtitle if exists
+                    if self.current_subtitle:
+                        finished.append(self._close_current())
+
+                    # Start new subtitle
+                    self.current_subtitle = {
+                        'start_ms': self._frame_ms(frame_count, time_ms),
+                        'text': best_subtitle,
+                        'confidence': round(float(best_confidence), 4),
+                        'box': self._bounding_box(best_boxes),
+                    }
+                    self.dedup.add(best_subtitle)
+
+                # Update last valid subtitle frame
+                self.last_valid_subtitle_frame = frame_count
+                self.last_valid_subtitle_ms = self._frame_ms(frame_count, time_ms)
+                self.frames_without_subtitle = 0
+
+        else:
+            self.frames_without_subtitle += 1
+
+        # Check if subtitle should be considered disappeared
+        if self.current_subtitle and self.frames_without_subtitle >= self.subtitle_disappear_threshold:
+            finished.append(self._close_current())
+
+        return finished
+
+    def finish(self) -> List[Cue]:
+        """
+        Close the subtitle still on screen at the end of the video
+        """
+        if self.current_subtitle:
+            return [self._close_current()]
+        return []
+
+    def get_state(self) -> Dict:
+        """
+        Snapshot of the in-flight state, enough to continue with a new tracker
+        """
+        return {
+            'current_subtitle': dict(self.current_subtitle) if self.current_subtitle else None,
+            'frames_without_subtitle': self.frames_without_subtitle,
+            'last_valid_subtitle_frame': self.last_valid_subtitle_frame,
+            'last_valid_subtitle_ms': self.last_valid_subtitle_ms,
+            'previous_subtitles': self.dedup.texts,
+        }
+
+    def set_state(self, state: Dict) -> None:
+        """
+        Restore a snapshot taken with get_state
+        """
+        self.current_subtitle = dict(state['current_subtitle']) if state['current_subtitle'] else None
+        self.frames_without_subtitle = state['frames_without_subtitle']
+        self.last_valid_subtitle_frame = state['last_valid_subtitle_frame']
+        self.last_valid_subtitle_ms = state.get('last_valid_subtitle_ms',
+                                                self._frame_ms(self.last_valid_subtitle_frame))
+        self.dedup.reset()
+        for text in state['previous_subtitles']:
+            self.dedup.add(text)
+
+    def _close_current(self) -> Cue:
+        # Use the last frame where subtitle was definitely visible
+        subtitle = self.current_subtitle
+        self.current_subtitle = None
+        return Cue(subtitle['start_ms'], self.last_valid_subtitle_ms, subtitle['text'],
+                   subtitle.get('confidence'), subtitle.get('box'))
+
+    def _frame_ms(self, frame_count: int, time_ms: Optional[int] = None) -> int:
+        """
+        Time of a frame in milliseconds, its timestamp when known
+        """
+        if time_ms is not None:
+            return int(time_ms)
+        return int(round(frame_count * 1000 / self.fps))
+
+    @staticmethod
+    def _bounding_box(boxes) -> Optional[List[int]]:
+        """
+        [x_min, y_min, x_max, y_max] around the points of all boxes, JSON-friendly for checkpoints
+        """
+        if not boxes:
+            return None
+        points = [point for box in boxes for point in box]
+        xs = [float(x) for x, _ in points]
+        ys = [float(y) for _, y in points]
+        return [int(min(xs)), int(min(ys)), int(round(max(xs))), int(round(max(ys)))]
@@ -1,26 +1,43 @@
 import os
 import cv2
-import copy
 import numpy as np
 from PIL import Image
 from paddleocr.ppocr.utils.logging import get_logger
 import paddleocr.tools.infer.utility as utility
 import paddleocr.tools.infer.predict_det as predict_det
 import paddleocr.tools.infer.predict_rec as predict_rec
-from utils import sorted_boxes, filter_center_bottom_bboxes
+from utils import box_rows, select_subtitle_boxes, roi_to_pixels
+from .stats import NULL_STATS
 
 # from paddleocr.ppocr.utils.utility import get_image_file_list, check_and_read
 
 logger = get_logger()
 
 class TextOcr(object):
-    def __init__(self, args) -> None:
+    def __init__(self, args, text_detector=None, text_recognizer=None) -> None:
+        """
+        :param args: PaddleOCR inference arguments, see utils.init_args
+        :param text_detector: Already loaded detector to use instead of loading one from args
+        :param text_recognizer: Already loaded recognizer to use instead of loading one from args
+        """
         self.args = args
-        self.text_detector = predict_det.TextDetector(args)
-        self.text_recognizer = predict_rec.TextRecognizer(args)
+        self.text_detector = text_detector or predict_det.TextDetector(args)
+        self.text_recognizer = text_recognizer or predict_rec.TextRecognizer(args)
         self.crop_image_res_index = 0
+        # Subtitle band as (top, bottom, left, right) ratios, None to detect on the full frame
+        self.roi = getattr(args, "subtitle_roi", None)
+        # Overrides of the filter_center_bottom_bboxes ratios, e.g. from ROI calibration
+        self.filter_kwargs = {}
+        # ExtractionStats the stages are timed into, set by the extractor for a run
+        self.stats = NULL_STATS
         # self.pad = args.padding_value
 
+    def get_roi_box(self, img_height, img_width):
+        """
+        Pixel window (top, bottom, left, right) the detector runs on
+        """
+        return roi_to_pixels(self.roi, img_height, img_width)
+
     def draw_crop_rec_res(self, output_dir, img_crop_list):
         os.makedirs(output_dir, exist_ok=True)
         bbox_num = len(img_crop_list)
@@ -76,6 +93,42 @@ class TextOcr(object):
             dst_img = np.rot90(dst_img)
         return dst_img
 
+    def get_axis_aligned_crop(self, img, points, tolerance=1.5):
+        """
+        Crop a near axis-aligned quad with a plain slice instead of a perspective warp
+
+        Burned-in subtitles are almost always horizontal, so their boxes are
+        rectangles up to a pixel of detector jitter. Those are cropped as a view
+        of the frame, resized only when the slice misses the warp output size.
+
+        Returns:
+            The crop, or None when the quad is rotated and needs get_rotate_crop_image
+        """
+        if len(points) != 4:
+            return None
+        xs, ys = points[:, 0], points[:, 1]
+        if (abs(ys[0] - ys[1]) > tolerance or abs(ys[3] - ys[2]) > tolerance
+                or abs(xs[0] - xs[3]) > tolerance or abs(xs[1] - xs[2]) > tolerance):
+            return None
+
+        img_height, img_width = img.shape[0:2]
+        left = max(0, int(round(xs.min())))
+        right = min(img_width, int(round(xs.max())))
+        top = max(0, int(round(ys.min())))
+        bottom = min(img_height, int(round(ys.max())))
+        if right <= left or bottom <= top:
+            return None
+
+        img_crop = img[top:bottom, left:right]
+        # Same output size as get_rotate_crop_image would give
+        crop_width = int(max(xs[1] - xs[0], xs[2] - xs[3]))
+        crop_height = int(max(ys[3] - ys[0], ys[2] - ys[1]))
+        if crop_width > 0 and crop_height > 0 and img_crop.shape[:2] != (crop_height, crop_width):
+            img_crop = cv2.resize(img_crop, (crop_width, crop_height), interpolation=cv2.INTER_LINEAR)
+        if img_crop.shape[0] * 1.0 / img_crop.shape[1] >= 2.0:
+            img_crop = np.rot90(img_crop)
+        return img_crop
+
     def get_minarea_rect_crop(self, img, points):
         bounding_box = cv2.minAreaRect(np.array(points).astype(np.int32))
         points = sorted(list(cv2.boxPoints(bounding_box)), key=lambda x: x[0])
@@ -98,8 +151,71 @@ class TextOcr(object):
         crop_img = self.get_rotate_crop_image(img, np.array(box))
         return crop_img
     
+    def detect(self, img):
+        """
+        Detect subtitle boxes in a frame and crop them out for recognition
+
+        Returns:
+            Tuple of (dt_boxes, img_crop_list), dt_boxes is None when no subtitle box was found
+        """
+        h, w = img.shape[:2]
+        stats = self.stats
+        # Detect on the subtitle band only and map boxes back to frame coordinates
+        top, bottom, left, right = self.get_roi_box(h, w)
+        with stats.timer("det"):
+            dt_boxes, elapse = self.text_detector(np.ascontiguousarray(img[top:bottom, left:right]))
+        stats.observe("boxes_per_frame", 0 if dt_boxes is None else len(dt_boxes))
+
+        with stats.timer("crop"):
+            if dt_boxes is not None and len(dt_boxes) and (top or left):
+                dt_boxes = dt_boxes + np.array([left, top], dtype=dt_boxes.dtype)
+            # Keep subtitle-like boxes, top to bottom
+            indices = select_subtitle_boxes(dt_boxes, h, w, **self.filter_kwargs)
+            dt_boxes = [dt_boxes[i] for i in indices]
+
+            if not dt_boxes:
+                logger.debug("no dt_boxes found, elapsed : {}".format(elapse))
+                return None, []
+            kept_boxes, img_crop_list = [], []
+
+            # Crops never write to the frame or the boxes, so neither is copied
+            for box in dt_boxes:
+                img_crop = self.get_axis_aligned_crop(img, box)
+                if img_crop is None:
+                    stats.count("rotated_crops")
+                    if self.args.det_box_type == "quad":
+                        img_crop = self.get_rotate_crop_image(img, box.astype(np.float32, copy=False))
+                    else:
+                        img_crop = self.get_minarea_rect_crop(img, box)
+                    
+                # Ignore all vertical box, dropping it from the boxes too so both stay aligned
+                if img_crop.shape[1] > img_crop.shape[0]: # Width > Height
+                    kept_boxes.append(box)
+                    img_crop_list.append(img_crop)
+
+        stats.count("crops", len(img_crop_list))
+        if not kept_boxes:
+            return None, []
+        return kept_boxes, img_crop_list
+
+    def recognize(self, crop_groups, box_groups=None):
+        """
+        Recognize the crops of one or more frames with a single recognizer call
+
+        Args:
+            crop_groups: Crops of each frame
+            box_groups: Boxes of the crops of each frame, when the routing of the crops depends on them
+
+        Returns:
+            Tuple of (list of rec_res per group, elapsed time)
+        """
+        crops = [crop for group in crop_groups for crop in group]
+        if not crops:
+            return [[] for _ in crop_groups], 0
+        rec_res, elapse = self.text_recognizer(crops)
+        return _split_groups(rec_res, crop_groups), elapse
+
     def __call__(self, img):
-        # time_dict = {"det": 0, "rec": 0, "cls": 0, "all": 0}
         if isinstance(img, str):
             img = Image.open(img).convert('RGB')
             img = np.array(img)
@@ -108,62 +224,133 @@ class TextOcr(object):
             logger.debug("no valid image provided")
             return None, None
         
-        h, w = img.shape[:2]
-        # start = time.time()
-        ori_im = img.copy()
-        dt_boxes, elapse = self.text_detector(img)
-        # Filter boxes for center-bottom subtitles
-        dt_boxes = sorted_boxes(dt_boxes)
-        dt_boxes = filter_center_bottom_bboxes(dt_boxes, h, w)   
-
-        # time_dict["det"] = elapse
-
-        if not dt_boxes:
-            logger.debug("no dt_boxes found, elapsed : {}".format(elapse))
-            # end = time.time()
-            # time_dict["all"] = end - start
-            return None, None #, time_dict
-        # else:
-        #     logger.debug(
-        #         "dt_boxes num : {}, elapsed : {}".format(len(dt_boxes), elapse)
-        #     )
-        img_crop_list = []
-
-        for bno in range(len(dt_boxes)):
-            tmp_box = copy.deepcopy(dt_boxes[bno])
-            if self.args.det_box_type == "quad":
-                img_crop = self.get_rotate_crop_image(ori_im, tmp_box)
-            else:
-                img_crop = self.get_minarea_rect_crop(ori_im, tmp_box)
-                
-            # Ignore all vertical box
-            if img_crop.shape[1] > img_crop.shape[0]: # Width > Height
-                img_crop_list.append(img_crop)
+        dt_boxes, img_crop_list = self.detect(img)
+        if dt_boxes is None:
+            return None, None
 
         if len(img_crop_list) > 1000:
             logger.debug(
                 f"rec crops num: {len(img_crop_list)}, time and memory cost may be large."
             )
             
-        rec_res, elapse = self.text_recognizer(img_crop_list)
-        assert len(rec_res) <= len(dt_boxes)
-        # time_dict["rec"] = elapse
+        with self.stats.timer("rec"):
+            (rec_res,), elapse = self.recognize([img_crop_list], [dt_boxes])
+        assert len(rec_res) == len(dt_boxes)
         logger.debug("rec_res num  : {}, elapsed : {}".format(len(rec_res), elapse))
-    
-        # end = time.time()
-        # time_dict["all"] = end - start
         
-        if rec_res:
-            # Sort boxes by vertical position (top to bottom)
-            combined_results = list(zip(dt_boxes, rec_res))
-            combined_results.sort(key=lambda x: x[0][0][1])  # Sort by y-coordinate
-            
-            # Unzip the sorted results
-            dt_boxes = [box for box, _ in combined_results]
-            rec_res = [rec for _, rec in combined_results]
-            
         return dt_boxes, rec_res
 
+    def process_batch(self, imgs):
+        """
+        OCR several frames, recognizing the crops of all of them in one batch
+
+        Detection still runs per frame, but the recognizer receives every crop at
+        once and can fill its `rec_batch_num` batches instead of running one
+        predictor call per 1-3 crops of a single frame.
+
+        Returns:
+            List of (dt_boxes, rec_res) in the order of `imgs`, same as calling the instance on each frame
+        """
+        detections = [self.detect(img) for img in imgs]
+        with self.stats.timer("rec"):
+            rec_groups, elapse = self.recognize([img_crop_list for _, img_crop_list in detections],
+                                                [dt_boxes for dt_boxes, _ in detections])
+        logger.debug("batch frames : {}, elapsed : {}".format(len(imgs), elapse))
+
+        # Scatter the recognition results back to their frames
+        results = []
+        for (dt_boxes, _), rec_res in zip(detections, rec_groups):
+            if dt_boxes is None:
+                results.append((None, None))
+                continue
+            results.append((dt_boxes, rec_res))
+        return results
+
+class MultiLangTextOcr(TextOcr):
+    """
+    TextOcr running detection once and several recognizers, for bilingual subtitles
+
+    The detector is language independent, so each line crop only needs to go to
+    the right recognizer:
+
+    - "position": the i-th line from the top goes to the i-th language, any
+      further line to the last one (e.g. ["zh", "en"] for Chinese above English).
+      Lines are rows of boxes (see utils.box_rows), so a line the detector
+      split in several boxes still goes to one recognizer
+    - "confidence": every recognizer reads every line and the most confident
+      reading wins, for layouts where the line order is not fixed
+    """
+
+    REC_MODES = ("position", "confidence")
+
+    def __init__(self, args, text_detector, text_recognizers, rec_mode: str = "position") -> None:
+        """
+        :param text_recognizers: Loaded recognizers by language code, in line order for "position"
+        :param rec_mode: One of REC_MODES
+        """
+        if rec_mode not in self.REC_MODES:
+            raise ValueError(f"Recognition mode '{rec_mode}' not supported. Use one of: {', '.join(self.REC_MODES)}")
+        super().__init__(args, text_detector, next(iter(text_recognizers.values())))
+        self.text_recognizers = text_recognizers
+        self.langs = list(text_recognizers)
+        self.rec_mode = rec_mode
+
+    def recognize(self, crop_groups, box_groups=None):
+        if self.rec_mode == "confidence":
+            return self._recognize_by_confidence(crop_groups)
+        return self._recognize_by_position(crop_groups, box_groups)
+
+    def _recognize_by_position(self, crop_groups, box_groups=None):
+        rec_groups = [[None] * len(group) for group in crop_groups]
+        # Row of each crop, one row per crop when the boxes are not known
+        row_groups = []
+        for g, group in enumerate(crop_groups):
+            rows = list(range(len(group)))
+            if box_groups is not None and box_groups[g] is not None and len(box_groups[g]) == len(group):
+                for row, indices in enumerate(box_rows(box_groups[g])):
+                    for index in indices:
+                        rows[index] = row
+            row_groups.append(rows)
+
+        total_elapse = 0
+        last = len(self.langs) - 1
+        for i, lang in enumerate(self.langs):
+            # Lines routed to this language, across every frame of the batch
+            slots = [
+                (g, line) for g, rows in enumerate(row_groups)
+                for line, row in enumerate(rows) if min(row, last) == i
+            ]
+            if not slots:
+                continue
+            rec_res, elapse = self.text_recognizers[lang]([crop_groups[g][line] for g, line in slots])
+            total_elapse += elapse
+            for (g, line), res in zip(slots, rec_res):
+                rec_groups[g][line] = res
+        return rec_groups, total_elapse
+
+    def _recognize_by_confidence(self, crop_groups):
+        crops = [crop for group in crop_groups for crop in group]
+        if not crops:
+            return [[] for _ in crop_groups], 0
+
+        best, total_elapse = None, 0
+        for lang in self.langs:
+            rec_res, elapse = self.text_recognizers[lang](crops)
+            total_elapse += elapse
+            if best is None:
+                best = list(rec_res)
+            else:
+                best = [new if new[1] > old[1] else old for old, new in zip(best, rec_res)]
+        return _split_groups(best, crop_groups), total_elapse
+
+def _split_groups(items, groups):
+    """Split a flat list back into chunks the size of each group"""
+    split, offset = [], 0
+    for group in groups:
+        split.append(list(items[offset:offset + len(group)]))
+        offset += len(group)
+    return split
+
 if __name__ == "__main__":
     args = utility.parse_args()
     path = "C:/Subtitle-Extraction/image.png"
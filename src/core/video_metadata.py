@@ -0,0 +1,147 @@
+import json
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import cv2
+
+# Relative difference between the nominal and the average frame rate above which a video is VFR
+VFR_TOLERANCE = 0.01
+
+def _parse_rate(rate: Optional[str]) -> float:
+    """Frame rate of an FFprobe fraction such as "30000/1001", 0 if unknown"""
+    try:
+        num, _, den = (rate or "0/0").partition('/')
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+def _ffprobe(video_path: str) -> Optional[Dict]:
+    """
+    Metadata of the first video stream from FFprobe, None if FFprobe is missing or fails
+    """
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=codec_name,width,height,r_frame_rate,avg_frame_rate,nb_frames,duration'
+                         ':format=duration',
+        '-of', 'json',
+        video_path,
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    info = json.loads(result.stdout or "{}")
+    streams = info.get('streams') or []
+    if not streams:
+        return None
+    stream = streams[0]
+
+    nominal_fps = _parse_rate(stream.get('r_frame_rate'))
+    average_fps = _parse_rate(stream.get('avg_frame_rate'))
+    fps = average_fps or nominal_fps
+    duration = float(stream.get('duration') or info.get('format', {}).get('duration') or 0)
+    total_frames = int(stream.get('nb_frames') or 0) or int(round(duration * fps))
+    return {
+        'fps': fps,
+        'total_frames': total_frames,
+        'width': int(stream.get('width') or 0),
+        'height': int(stream.get('height') or 0),
+        'duration': duration,
+        'codec': stream.get('codec_name', 'unknown'),
+        'vfr': bool(nominal_fps and average_fps
+                    and abs(nominal_fps - average_fps) / nominal_fps > VFR_TOLERANCE),
+    }
+
+def _opencv_probe(video_path: str) -> Optional[Dict]:
+    """
+    Metadata from the OpenCV capture, for when FFprobe is not available
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        return {
+            'fps': fps,
+            'total_frames': total_frames,
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'duration': total_frames / fps if fps else 0.0,
+            'codec': "".join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)).strip() or 'unknown',
+            'vfr': False,
+        }
+    finally:
+        cap.release()
+
+class VideoMetadataCache:
+    """
+    Process-wide cache of probed video metadata, keyed by path, size and modification time
+
+    Every entry point (extractor, result cache, web app, FFmpeg processor)
+    asks here instead of opening the container itself, so a job probes its
+    video once. Metadata comes from FFprobe when it is installed, with OpenCV
+    as the fallback.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        """
+        :param max_entries: Maximum number of videos whose metadata is kept
+        """
+        self.max_entries = max_entries
+        self._metadata: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(video_path: str) -> Tuple:
+        stat = os.stat(video_path)
+        return (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+
+    def _lookup(self, entries: OrderedDict, key: Tuple):
+        with self._lock:
+            if key in entries:
+                entries.move_to_end(key)
+                return True, entries[key]
+        return False, None
+
+    def _store(self, entries: OrderedDict, key: Tuple, value, max_entries: int) -> None:
+        with self._lock:
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > max_entries:
+                entries.popitem(last=False)
+
+    def probe(self, video_path: str) -> Optional[Dict]:
+        """
+        Metadata of a video: fps, total_frames, width, height, duration (seconds), codec and vfr
+
+        :return: A new dict on every call, or None if the video cannot be read
+        """
+        try:
+            key = self._key(video_path)
+        except OSError:
+            return None
+        found, metadata = self._lookup(self._metadata, key)
+        if not found:
+            metadata = _ffprobe(video_path) or _opencv_probe(video_path)
+            if metadata is None:
+                return None
+            self._store(self._metadata, key, metadata, self.max_entries)
+        return dict(metadata)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._metadata.clear()
+
+# Shared by every entry point of the process
+default_metadata_cache = VideoMetadataCache()
+
+def probe_video(video_path: str) -> Optional[Dict]:
+    return default_metadata_cache.probe(video_path)
@@ -1,12 +1,30 @@
 import os
+import re
 import subprocess
+import tempfile
+import threading
+from collections import deque
 import streamlit as st
 
+from .video_metadata import probe_video
+
+# Soft subtitle codec each container can carry, by output extension
+SUBTITLE_CODECS = {
+    '.mp4': 'mov_text',
+    '.m4v': 'mov_text',
+    '.mov': 'mov_text',
+    '.mkv': 'srt',
+    '.webm': 'webvtt',
+}
+
+# Lines of FFmpeg's stderr kept for error messages
+STDERR_TAIL_LINES = 20
+
 class SubtitleVideoProcessor:
     @staticmethod
     def get_video_metadata(video_path):
         """
-        Get video metadata using FFprobe.
+        Get video metadata, probed once per file and shared with the extractor.
         
         Args:
             video_path (str): Path to the video file
@@ -14,66 +32,153 @@ class SubtitleVideoProcessor:
         Returns:
             dict: Video metadata including duration, width, height, codec
         """
-        try:
-            cmd = [
-                'ffprobe', 
-                '-v', 'quiet', 
-                '-print_format', 'json', 
-                '-show_format', 
-                '-show_streams', 
-                video_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                import json
-                metadata = json.loads(result.stdout)
-                
-                # Extract relevant video stream information
-                video_stream = next((stream for stream in metadata.get('streams', []) if stream['codec_type'] == 'video'), None)
-                
-                if video_stream:
-                    return {
-                        'duration': float(metadata['format'].get('duration', 0)),
-                        'width': int(video_stream.get('width', 0)),
-                        'height': int(video_stream.get('height', 0)),
-                        'codec': video_stream.get('codec_name', 'unknown')
-                    }
-            return None
-        except Exception as e:
-            st.error(f"Error getting video metadata: {e}")
-            return None
+        metadata = probe_video(video_path)
+        if metadata is None:
+            st.error(f"Error getting video metadata: cannot read {video_path}")
+        return metadata
 
     @staticmethod
-    def add_subtitles_to_video(video_path, srt_path, output_path):
+    def add_subtitles_to_video(video_path, srt_path, output_path, mode="mux", language=None,
+                               preset="medium", crf=20, threads=0, progress_bar=None):
         """
         Add subtitles to a video using FFmpeg.
-        
+
+        "mux" attaches them as a soft subtitle stream and copies the video and
+        audio streams as they are, which takes seconds. "burn" draws them into
+        the picture, which re-encodes the whole video.
+
         Args:
             video_path (str): Path to the input video
-            srt_path (str): Path to the subtitle .srt file
-            output_path (str): Path to save the output video with subtitles
-        
+            srt_path (str): Path to the subtitle file (.srt, .vtt or .ass)
+            output_path (str): Path to save the output video with subtitles,
+                .mp4/.m4v/.mov/.mkv/.webm for "mux"
+            mode (str): "mux" or "burn"
+            language (str): ISO 639-2 language of the subtitle stream, e.g. "eng", for "mux"
+            preset (str): x264 preset for "burn", faster presets give larger files
+            crf (int): x264 quality for "burn", lower is better
+            threads (int): Encoder threads for "burn", 0 lets FFmpeg decide
+            progress_bar: Object with a progress(percent) method, e.g. a Streamlit progress bar
+
         Returns:
             bool: True if successful, False otherwise
         """
         try:
-            cmd = [
-                'ffmpeg',
-                '-i', video_path,
-                '-vf', f"subtitles={srt_path}:force_style='FontName=Arial,FontSize=24'",
-                '-c:a', 'copy',
-                output_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                return True
+            if mode == "mux":
+                cmd = SubtitleVideoProcessor.mux_command(video_path, srt_path, output_path, language)
+            elif mode == "burn":
+                cmd = SubtitleVideoProcessor.burn_command(video_path, srt_path, preset, crf, threads)
             else:
-                st.error(f"FFmpeg error: {result.stderr}")
-                return False
+                raise ValueError(f"Mode '{mode}' not supported. Use 'mux' or 'burn'")
+
+            metadata = SubtitleVideoProcessor.get_video_metadata(video_path) if progress_bar else None
+            duration = metadata['duration'] if metadata else 0
+            return SubtitleVideoProcessor._run_ffmpeg(cmd, output_path, duration, progress_bar)
         except Exception as e:
             st.error(f"Error adding subtitles: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    @staticmethod
+    def mux_command(video_path, srt_path, output_path, language=None):
+        """
+        FFmpeg arguments adding a soft subtitle stream without re-encoding.
+
+        Returns:
+            list: Command without the output path
+        """
+        container = os.path.splitext(output_path)[1].lower()
+        if container not in SUBTITLE_CODECS:
+            raise ValueError(f"Cannot mux subtitles into '{container}' files. "
+                             f"Use one of: {', '.join(SUBTITLE_CODECS)}")
+        codec = SUBTITLE_CODECS[container]
+        if codec == 'srt' and srt_path.lower().endswith('.ass'):
+            codec = 'ass'  # Keep the styling in Matroska
+
+        cmd = [
+            'ffmpeg', '-hide_banner', '-nostdin', '-y',
+            '-i', video_path,
+            '-i', srt_path,
+            # Every video and audio stream of the input, then the new subtitles
+            '-map', '0:v', '-map', '0:a?', '-map', '1:0',
+            '-c', 'copy',
+            '-c:s', codec,
+            '-disposition:s:0', 'default',
+        ]
+        if language:
+            cmd += ['-metadata:s:s:0', f'language={language}']
+        return cmd
+
+    @staticmethod
+    def burn_command(video_path, srt_path, preset="medium", crf=20, threads=0):
+        """
+        FFmpeg arguments drawing the subtitles into the video with x264.
+
+        Returns:
+            list: Command without the output path
+        """
+        # The path is escaped twice, for the filter options and then for the filtergraph
+        escaped = srt_path.replace('\\', '/').replace(':', r'\:').replace("'", r"\'")
+        escaped = re.sub(r"([\\'\[\],;])", r"\\\1", escaped)
+        video_filter = f"subtitles={escaped}"
+        if not srt_path.lower().endswith('.ass'):
+            video_filter += ":force_style='FontName=Arial,FontSize=24'"
+        return [
+            'ffmpeg', '-hide_banner', '-nostdin', '-y',
+            '-i', video_path,
+            '-vf', video_filter,
+            '-c:v', 'libx264', '-preset', preset, '-crf', str(crf),
+            '-threads', str(threads),
+            '-c:a', 'copy',
+        ]
+
+    @staticmethod
+    def _run_ffmpeg(cmd, output_path, duration=0, progress_bar=None):
+        """
+        Run FFmpeg into a temporary file next to output_path, renamed to it on success.
+
+        Progress is read from `-progress` as FFmpeg writes it, and only the
+        last lines of stderr are kept for the error message.
+        """
+        directory = os.path.dirname(os.path.abspath(output_path))
+        stem, extension = os.path.splitext(os.path.basename(output_path))
+        # The extension stays last, FFmpeg picks the container from it
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{stem}-", suffix=extension, dir=directory)
+        os.close(fd)
+
+        cmd = cmd + ['-progress', 'pipe:1', '-nostats', '-loglevel', 'error', tmp_path]
+        process = None
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       text=True, errors='replace')
+            stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+            stderr_reader = threading.Thread(target=stderr_tail.extend, args=(process.stderr,), daemon=True)
+            stderr_reader.start()
+
+            last_progress = -1
+            for line in process.stdout:
+                key, _, value = line.strip().partition('=')
+                if not progress_bar:
+                    continue
+                if key == 'out_time_us' and duration > 0 and value.isdigit():
+                    progress = min(100, int(int(value) / 1e6 / duration * 100))
+                elif key == 'progress' and value == 'end':
+                    progress = 100
+                else:
+                    continue
+                if progress != last_progress:
+                    progress_bar.progress(progress)
+                    last_progress = progress
+
+            returncode = process.wait()
+            stderr_reader.join()
+            if returncode != 0:
+                st.error(f"FFmpeg error: {''.join(stderr_tail)}")
+                return False
+            os.replace(tmp_path, output_path)
+            return True
+        finally:
+            if process is not None and process.poll() is None:
+                # Interrupted, e.g. by a Streamlit rerun: stop FFmpeg before removing its output
+                process.kill()
+                process.wait()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,355 @@
+import json
+import os
+import tempfile
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .cues import Cue, format_srt_cue, format_timestamp
+
+# Bytes buffered before a write reaches the file
+DEFAULT_BUFFERING = 64 * 1024
+
+class SubtitleWriter:
+    """
+    Streams cues to a subtitle file one at a time, as they are extracted
+
+    Use open() to write to a path, the file is then buffered and fsynced on
+    close. With `atomic=True` it is written under a temporary name next to
+    the target and only renamed to it by close(), so an interrupted run never
+    leaves a partial file behind. Also usable as a context manager, which
+    aborts on error.
+    """
+
+    extension = ""
+
+    def __init__(self, f: IO[str]) -> None:
+        """
+        :param f: Text stream to write to, left open by close() unless the writer opened it
+        """
+        self.f = f
+        self.count = 0
+        self.closed = False
+        self.path: Optional[str] = None
+        self._tmp_path: Optional[str] = None
+        self._owns_file = False
+        self.f.write(self.header())
+
+    @classmethod
+    def open(cls, path: str, atomic: bool = False, buffering: int = DEFAULT_BUFFERING,
+             **options) -> "SubtitleWriter":
+        """
+        Writer to a file
+
+        :param atomic: Write to a temporary file renamed to `path` on close
+        :param buffering: Size of the write buffer in bytes
+        :param options: Options of the writer class
+        """
+        tmp_path = None
+        if atomic:
+            fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}-", suffix=".tmp",
+                                            dir=os.path.dirname(os.path.abspath(path)))
+            f = os.fdopen(fd, 'w', encoding='utf-8', newline='\n', buffering=buffering)
+        else:
+            f = open(path, 'w', encoding='utf-8', newline='\n', buffering=buffering)
+        try:
+            writer = cls(f, **options)
+        except BaseException:
+            f.close()
+            if tmp_path:
+                os.remove(tmp_path)
+            raise
+        writer.path = path
+        writer._tmp_path = tmp_path
+        writer._owns_file = True
+        return writer
+
+    def header(self) -> str:
+        return ""
+
+    def footer(self) -> str:
+        return ""
+
+    def format_cue(self, cue: Cue, index: int) -> str:
+        raise NotImplementedError
+
+    def write(self, cue: Cue) -> None:
+        self.count += 1
+        self.f.write(self.format_cue(Cue.from_mapping(cue), self.count))
+
+    def close(self) -> None:
+        """
+        Finish the file and make sure it is on disk
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.f.write(self.footer())
+        self.f.flush()
+        if self._owns_file:
+            os.fsync(self.f.fileno())
+            self.f.close()
+            if self._tmp_path:
+                os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        """
+        Stop writing after an error, removing the temporary file of an atomic writer
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self._owns_file:
+            self.f.close()
+            if self._tmp_path and os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+        else:
+            self.f.flush()
+
+    def __enter__(self) -> "SubtitleWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+class SrtWriter(SubtitleWriter):
+    extension = ".srt"
+
+    def format_cue(self, cue: Cue, index: int) -> str:
+        return format_srt_cue(index, cue.start_ms, cue.end_ms, cue.text)
+
+class VttWriter(SubtitleWriter):
+    extension = ".vtt"
+
+    def header(self) -> str:
+        return "WEBVTT\n\n"
+
+    def format_cue(self, cue: Cue, index: int) -> str:
+        # Markup characters would be read as tags, blank lines would end the cue
+        text = cue.text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        text = "\n".join(line for line in text.split("\n") if line.strip())
+        return f"{index}\n{format_timestamp(cue.start_ms, '.')} --> {format_timestamp(cue.end_ms, '.')}\n{text}\n\n"
+
+def format_ass_timestamp(ms: int) -> str:
+    """
+    ASS timestamp, H:MM:SS.cc in centiseconds
+    """
+    centiseconds = int(round(ms / 10))
+    seconds, centiseconds = divmod(centiseconds, 100)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}.{centiseconds:02d}"
+
+def split_bilingual(text: str) -> Tuple[str, str]:
+    """
+    Split a bilingual cue into its first-language line and the rest
+
+    Matches the "position" routing of MultiLangTextOcr, where the top line goes
+    to the first language and any further line to the second. Cue lines are
+    rows of boxes (see SubtitleTracker), the same lines that routing sees.
+    """
+    primary, _, secondary = text.partition("\n")
+    return primary, secondary
+
+class AssWriter(SubtitleWriter):
+    """
+    Advanced SubStation Alpha writer
+
+    With `bilingual=True` each cue is split with split_bilingual into two
+    events in their own styles, "Primary" above the smaller "Secondary", so
+    players and editors can restyle or hide either language.
+    """
+
+    extension = ".ass"
+
+    def __init__(self, f: IO[str], width: int = 1920, height: int = 1080, font: str = "Arial",
+                 font_size: Optional[int] = None, bilingual: bool = False) -> None:
+        """
+        :param width: Video width, the script resolution styles and margins are relative to
+        :param height: Video height
+        :param font_size: Font size of the main text, a 20th of the height by default
+        :param bilingual: Write the first line and the rest of each cue as separate styled events
+        """
+        self.width = width
+        self.height = height
+        self.font = font
+        self.font_size = font_size or max(8, height // 20)
+        self.bilingual = bilingual
+        super().__init__(f)
+
+    def _style(self, name: str, size: int, margin_v: int) -> str:
+        # Bottom center, white with a black outline
+        outline = max(1, size // 16)
+        return (f"Style: {name},{self.font},{size},&H00FFFFFF,&H000000FF,&H00000000,&H80000000,"
+                f"0,0,0,0,100,100,0,0,1,{outline},0,2,10,10,{margin_v},1\n")
+
+    def header(self) -> str:
+        margin = max(10, self.height // 30)
+        secondary_size = max(8, int(self.font_size * 0.8))
+        styles = self._style("Default", self.font_size, margin)
+        if self.bilingual:
+            styles += self._style("Primary", self.font_size, margin + int(secondary_size * 1.3))
+            styles += self._style("Secondary", secondary_size, margin)
+        return (
+            "[Script Info]\n"
+            "ScriptType: v4.00+\n"
+            f"PlayResX: {self.width}\n"
+            f"PlayResY: {self.height}\n"
+            "WrapStyle: 0\n"
+            "ScaledBorderAndShadow: yes\n"
+            "\n"
+            "[V4+ Styles]\n"
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+            "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, "
+            "Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n"
+            f"{styles}"
+            "\n"
+            "[Events]\n"
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+        )
+
+    @staticmethod
+    def _escape(text: str) -> str:
+        # Braces start override blocks, newlines are \N
+        return text.replace("\\", "\\\\").replace("{", "\\{").replace("}", "\\}").replace("\n", "\\N")
+
+    def _event(self, cue: Cue, style: str, text: str) -> str:
+        return (f"Dialogue: 0,{format_ass_timestamp(cue.start_ms)},{format_ass_timestamp(cue.end_ms)},"
+                f"{style},,0,0,0,,{self._escape(text)}\n")
+
+    def format_cue(self, cue: Cue, index: int) -> str:
+        if not self.bilingual:
+            return self._event(cue, "Default", cue.text)
+        primary, secondary = split_bilingual(cue.text)
+        events = self._event(cue, "Primary", primary)
+        if secondary:
+            events += self._event(cue, "Secondary", secondary)
+        return events
+
+class JsonlWriter(SubtitleWriter):
+    """
+    One JSON object per cue, with numeric times and the recognition metadata
+
+    Keys: index, start_ms, end_ms, start_time, end_time, text, confidence and
+    box, the last two null when the cue does not carry them (see Cue).
+    """
+
+    extension = ".jsonl"
+
+    def format_cue(self, cue: Cue, index: int) -> str:
+        record = {
+            'index': index,
+            'start_ms': cue.start_ms,
+            'end_ms': cue.end_ms,
+            'start_time': cue['start_time'],
+            'end_time': cue['end_time'],
+            'text': cue.text,
+            'confidence': cue.confidence,
+            'box': cue.box,
+        }
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+WRITERS: Dict[str, type] = {
+    'srt': SrtWriter,
+    'vtt': VttWriter,
+    'ass': AssWriter,
+    'jsonl': JsonlWriter,
+}
+
+class DualTrackWriter:
+    """
+    Bilingual layout as two separate tracks, one file per language
+
+    The first line of each cue goes to `primary` and the rest to `secondary`
+    (see split_bilingual); cues with nothing for a track are skipped in it.
+    Both writers can be of any format.
+    """
+
+    def __init__(self, primary: SubtitleWriter, secondary: SubtitleWriter) -> None:
+        self.primary = primary
+        self.secondary = secondary
+
+    def write(self, cue: Cue) -> None:
+        cue = Cue.from_mapping(cue)
+        for writer, text in zip((self.primary, self.secondary), split_bilingual(cue.text)):
+            if text:
+                writer.write(Cue(cue.start_ms, cue.end_ms, text, cue.confidence, cue.box))
+
+    def close(self) -> None:
+        self.primary.close()
+        self.secondary.close()
+
+    def abort(self) -> None:
+        self.primary.abort()
+        self.secondary.abort()
+
+    def __enter__(self) -> "DualTrackWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def open_writer(path: str, fmt: Optional[str] = None, **kwargs) -> SubtitleWriter:
+    """
+    Open a writer for `path`, in the format of its extension unless `fmt` is given
+
+    :param kwargs: Arguments of SubtitleWriter.open and the writer class
+    """
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    if fmt not in WRITERS:
+        raise ValueError(f"Subtitle format '{fmt}' not supported. Use one of: {', '.join(WRITERS)}")
+    return WRITERS[fmt].open(path, **kwargs)
+
+def open_writers(base_path: str, formats: Sequence[str], dual_track: bool = False,
+                 **kwargs) -> List:
+    """
+    Writers for `base_path` (without extension) in several formats
+
+    With `dual_track` each format is written as two files, <base>.1.<ext> and
+    <base>.2.<ext>, with the first and second language of bilingual cues.
+    """
+    writers = []
+    try:
+        for fmt in formats:
+            extension = WRITERS[fmt].extension if fmt in WRITERS else f".{fmt}"
+            if dual_track:
+                primary = open_writer(f"{base_path}.1{extension}", fmt, **kwargs)
+                try:
+                    secondary = open_writer(f"{base_path}.2{extension}", fmt, **kwargs)
+                except BaseException:
+                    primary.abort()
+                    raise
+                writers.append(DualTrackWriter(primary, secondary))
+            else:
+                writers.append(open_writer(f"{base_path}{extension}", fmt, **kwargs))
+    except BaseException:
+        for writer in writers:
+            writer.abort()
+        raise
+    return writers
+
+def write_through(cues: Iterable[Cue], writers: Sequence) -> Iterator[Cue]:
+    """
+    Pass cues on while writing each one to every writer
+
+    Wrap iter_subtitles with it to have the files grow while the video is
+    processed. The writers are closed once the cues are exhausted, and
+    aborted if iteration fails or stops early.
+    """
+    completed = False
+    try:
+        for cue in cues:
+            for writer in writers:
+                writer.write(cue)
+            yield cue
+        completed = True
+    finally:
+        for writer in writers:
+            if completed:
+                writer.close()
+            else:
+                writer.abort()
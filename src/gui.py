@@ -2,6 +2,10 @@ import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from core.subtitle_extractor import VideoSubtitleExtractor
+from core.checkpoint import checkpoint_path_for
+from core.cues import CueList
+from core.writers import WRITERS, open_writer
+from core.result_cache import ResultCache
 import time
 from ttkthemes import ThemedTk
 from utils import SUPPORTED_LANGUAGES, check_gpu_availability
@@ -25,6 +29,7 @@ class SubtitleExtractorApp:
         self.save_button = None  # Add this line to store save button reference
         self.selected_lang = "en"  # Default language
         self.is_gpu_available = check_gpu_availability()
+        self.result_cache = ResultCache()  # Re-runs with the same settings are served from disk
 
         self.setup_ui()
 
@@ -115,6 +120,18 @@ class SubtitleExtractorApp:
         self.lang_dropdown.pack(side=tk.LEFT, padx=5)
         self.lang_dropdown.bind('<<ComboboxSelected>>', self.on_lang_change)        
 
+        # Optional second language for bilingual subtitles (line below the first language)
+        ttk.Label(lang_frame, text="Second line:").pack(side=tk.LEFT, padx=(10, 0))
+        self.second_lang_var = tk.StringVar(value="None")
+        self.second_lang_dropdown = ttk.Combobox(
+            lang_frame,
+            values=["None"] + lang_options,
+            textvariable=self.second_lang_var,
+            state='readonly',
+            width=15
+        )
+        self.second_lang_dropdown.pack(side=tk.LEFT, padx=5)
+
         # Add GPU status indicator in settings frame
         gpu_frame = ttk.Frame(self.frame_settings)
         gpu_frame.pack(fill=tk.X, pady=5)
@@ -251,20 +268,39 @@ class SubtitleExtractorApp:
         frame_rate = self.scale_frame_rate.get()
         confidence_threshold = self.scale_confidence.get()
 
+        lang = self.selected_lang
+        second_lang = self.second_lang_dropdown.get().split(' - ')[0]
+        if second_lang not in ("None", lang):
+            lang = [lang, second_lang]
+
         extractor = VideoSubtitleExtractor(
-            lang=self.selected_lang,
-            use_gpu=self.is_gpu_available
+            lang=lang,
+            use_gpu=self.is_gpu_available,
+            result_cache=self.result_cache
         )
         start_time = time.time()
 
         try:
             self.update_progress(0, "Processing video...")
-            self.subtitles = extractor.extract_subtitles(
+            self.subtitles = CueList()
+            self.text_subtitles.delete(1.0, tk.END)
+            for subtitle in extractor.iter_subtitles(
                 video_path, 
                 frame_rate=frame_rate,
                 confidence_threshold=confidence_threshold,
-                progress_bar=self
-            )
+                progress_bar=self,
+                # Checkpoint next to the default output so a failed run can continue
+                checkpoint_path=checkpoint_path_for(f"{os.path.splitext(video_path)[0]}.srt"),
+                resume=True
+            ):
+                # Show subtitles while the video is still being processed
+                self.subtitles.append(subtitle)
+                if len(self.subtitles) <= self.MAX_DISPLAY_SUBTITLES:
+                    self.text_subtitles.insert(tk.END, 
+                        f"{len(self.subtitles)}. {subtitle['start_time']} --> {subtitle['end_time']}\n"
+                        f"{subtitle['text']}\n\n"
+                    )
+                    self.text_subtitles.see(tk.END)
 
             end_time = time.time()
             processing_time = end_time - start_time
@@ -337,15 +373,15 @@ class SubtitleExtractorApp:
             return
 
         output_filename = f"{os.path.splitext(os.path.basename(self.video_path))[0]}.srt"
-        output_path = filedialog.asksaveasfilename(defaultextension=".srt", initialfile=output_filename, filetypes=[("SRT files", "*.srt")])
+        filetypes = [(f"{fmt.upper()} files", f"*{writer.extension}") for fmt, writer in WRITERS.items()]
+        output_path = filedialog.asksaveasfilename(defaultextension=".srt", initialfile=output_filename, filetypes=filetypes)
 
         if output_path:
-            srt_content = ""
-            for i, subtitle in enumerate(self.subtitles, 1):
-                srt_content += f"{i}\n{subtitle['start_time']} --> {subtitle['end_time']}\n{subtitle['text']}\n\n"
-
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(srt_content)
+            # Format from the chosen extension, SRT for unknown ones
+            extension = os.path.splitext(output_path)[1].lstrip('.').lower()
+            with open_writer(output_path, extension if extension in WRITERS else 'srt') as writer:
+                for subtitle in self.subtitles:
+                    writer.write(subtitle)
 
             messagebox.showinfo("Info", f"Subtitles saved to {output_path}")
 
@@ -0,0 +1,462 @@
+"""
+Local HTTP service running subtitle extraction jobs from a persistent queue
+
+Jobs are stored in SQLite, so queued work survives restarts, and are run by a
+fixed pool of worker processes that keep their OCR models loaded between jobs.
+The number of extractions running at once is bounded by the pool size however
+many clients submit work.
+
+Endpoints (JSON unless noted):
+
+- GET /videos: videos available under VIDEO_INPUT_DIR
+- POST /jobs {"video": path relative to VIDEO_INPUT_DIR, "lang": "en" or ["zh", "en"],
+  "frame_rate", "confidence_threshold", "subtitle_disappear_threshold"}: queue a job,
+  or return the unfinished job already queued for the same video and settings
+- GET /jobs: most recent jobs
+- GET /jobs/<id>: status ("queued", "running", "done", "failed", "cancelled") and progress
+- GET /jobs/<id>/subtitles: extracted subtitles of a finished job
+- GET /jobs/<id>/srt, /vtt, /ass, /jsonl: the same as a subtitle file (text/plain)
+- DELETE /jobs/<id>: cancel a queued job
+
+Usage (from src):
+    VIDEO_INPUT_DIR=/videos python -m service --port 8765 --workers 2
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from core.cues import CueList
+from core.writers import WRITERS
+from utils import SUPPORTED_LANGUAGES, VIDEO_EXTENSIONS
+
+# Times a job is retried on a fresh pool after its worker process died, before it is failed
+MAX_POOL_RETRIES = 2
+
+JOB_STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+# Extraction settings a job may set, with their defaults
+JOB_PARAMS = {
+    'lang': 'en',
+    'frame_rate': 5,
+    'confidence_threshold': 0.7,
+    'subtitle_disappear_threshold': 10,
+}
+
+class JobStore:
+    """
+    SQLite table of extraction jobs, shared by the server and its worker processes
+
+    Every call uses its own short-lived connection, so the store can be used
+    from any thread or process.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    video_path TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    subtitles TEXT,
+                    subtitle_count INTEGER,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def _update(self, job_id: str, **fields) -> None:
+        fields['updated_at'] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as db:
+            db.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def submit(self, video_path: str, params: Dict) -> Dict:
+        """
+        Queue a job, or return the queued or running one for the same video and settings
+        """
+        params_json = json.dumps(params, sort_keys=True)
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT * FROM jobs WHERE video_path = ? AND params = ? AND status IN ('queued', 'running')",
+                (video_path, params_json)
+            ).fetchone()
+            if row:
+                return self._to_dict(row)
+
+            now = time.time()
+            job_id = uuid.uuid4().hex
+            db.execute(
+                "INSERT INTO jobs (id, video_path, params, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, video_path, params_json, now, now)
+            )
+        return self.get(job_id)
+
+    def claim_next(self) -> Optional[Dict]:
+        """
+        Mark the oldest queued job as running and return it, None when the queue is empty
+        """
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?",
+                       (time.time(), row['id']))
+        return self.get(row['id'])
+
+    def requeue_running(self) -> int:
+        """
+        Put jobs left running by a stopped server back in the queue, they resume from their checkpoint
+        """
+        with self._connect() as db:
+            return db.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running'", (time.time(),)
+            ).rowcount
+
+    def set_progress(self, job_id: str, progress: int) -> None:
+        self._update(job_id, progress=progress)
+
+    def finish(self, job_id: str, subtitles: CueList) -> None:
+        self._update(job_id, status='done', progress=100, subtitle_count=len(subtitles),
+                     subtitles=json.dumps(subtitles.to_dicts(), ensure_ascii=False))
+
+    def requeue(self, job_id: str) -> None:
+        self._update(job_id, status='queued')
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._update(job_id, status='failed', error=error)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job that has not started yet
+        """
+        with self._connect() as db:
+            return db.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            ).rowcount > 0
+
+    def get(self, job_id: str, with_subtitles: bool = False) -> Optional[Dict]:
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row, with_subtitles) if row else None
+
+    def list(self, limit: int = 50) -> List[Dict]:
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row, with_subtitles: bool = False) -> Dict:
+        job = {
+            'id': row['id'],
+            'video': row['video_path'],
+            'params': json.loads(row['params']),
+            'status': row['status'],
+            'progress': row['progress'],
+            'error': row['error'],
+            'subtitle_count': row['subtitle_count'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+        }
+        if with_subtitles:
+            job['subtitles'] = json.loads(row['subtitles']) if row['subtitles'] else None
+        return job
+
+# State of the current worker process, set up once by _init_worker
+_worker_state: Dict = {}
+
+def _init_worker(db_path: str, state_dir: str, use_gpu: bool, warm_lang) -> None:
+    from core.result_cache import ResultCache
+    from core.subtitle_extractor import VideoSubtitleExtractor
+
+    _worker_state.update(store=JobStore(db_path), state_dir=state_dir, use_gpu=use_gpu,
+                         result_cache=ResultCache())
+    # Load the most common models before the first job arrives
+    VideoSubtitleExtractor(lang=warm_lang, use_gpu=use_gpu)
+
+class _JobProgress:
+    """Progress bar stand-in storing the progress of a job"""
+
+    def __init__(self, store: JobStore, job_id: str) -> None:
+        self.store = store
+        self.job_id = job_id
+
+    def progress(self, value: int) -> None:
+        self.store.set_progress(self.job_id, int(value))
+
+def _run_job(job: Dict) -> None:
+    """
+    Run one job in a worker process and store its outcome
+    """
+    from core.checkpoint import checkpoint_path_for
+    from core.subtitle_extractor import VideoSubtitleExtractor
+
+    store = _worker_state['store']
+    params = job['params']
+    try:
+        # Models come from the process wide registry, so only the first job of a language loads them
+        extractor = VideoSubtitleExtractor(lang=params['lang'], use_gpu=_worker_state['use_gpu'],
+                                           result_cache=_worker_state['result_cache'])
+        checkpoint_path = checkpoint_path_for(os.path.join(_worker_state['state_dir'], f"{job['id']}.srt"))
+        subtitles = extractor.extract_subtitles(
+            job['video'],
+            frame_rate=params['frame_rate'],
+            confidence_threshold=params['confidence_threshold'],
+            subtitle_disappear_threshold=params['subtitle_disappear_threshold'],
+            progress_bar=_JobProgress(store, job['id']),
+            checkpoint_path=checkpoint_path,
+            resume=True
+        )
+    except Exception as e:
+        store.fail(job['id'], f"{type(e).__name__}: {e}")
+        return
+    store.finish(job['id'], subtitles)
+
+class JobRunner:
+    """
+    Feeds queued jobs to a fixed pool of warm worker processes
+    """
+
+    def __init__(self, store: JobStore, state_dir: str, workers: int = 1,
+                 use_gpu: bool = False, warm_lang="en") -> None:
+        self.store = store
+        self.workers = max(1, workers)
+        self.initargs = (store.path, state_dir, use_gpu, warm_lang)
+        self.slots = threading.Semaphore(self.workers)
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.executor = None
+        self.executor_lock = threading.Lock()
+        self.pool_retries: Dict[str, int] = {}
+        self.thread = threading.Thread(target=self._dispatch, name="job-dispatcher", daemon=True)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # Spawned workers, forking a process with loaded models is not safe
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker, initargs=self.initargs)
+
+    def _replace_executor(self, broken: ProcessPoolExecutor) -> None:
+        """
+        Start a fresh pool in place of a broken one, once however many jobs report it
+        """
+        with self.executor_lock:
+            if self.executor is broken and not self.stopping.is_set():
+                self.executor = self._new_executor()
+
+    def start(self) -> None:
+        requeued = self.store.requeue_running()
+        if requeued:
+            print(f"Requeued {requeued} interrupted job(s)", flush=True)
+        self.executor = self._new_executor()
+        self.thread.start()
+
+    def notify(self) -> None:
+        """Wake the dispatcher up, e.g. after a job was submitted"""
+        self.wakeup.set()
+
+    def stop(self) -> None:
+        self.stopping.set()
+        self.wakeup.set()
+        self.thread.join()
+        with self.executor_lock:
+            self.executor.shutdown(wait=True)
+
+    def _dispatch(self) -> None:
+        while not self.stopping.is_set():
+            if not self.slots.acquire(timeout=1.0):
+                continue
+            job = self.store.claim_next()
+            if job is None:
+                self.slots.release()
+                self.wakeup.wait(timeout=1.0)
+                self.wakeup.clear()
+                continue
+
+            executor = self.executor
+            try:
+                future = executor.submit(_run_job, job)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory), start a fresh pool and retry the job later
+                self._replace_executor(executor)
+                self.store.requeue(job['id'])
+                self.slots.release()
+                continue
+            future.add_done_callback(lambda f, job_id=job['id']: self._on_done(f, job_id, executor))
+
+    def _on_done(self, future, job_id: str, executor: ProcessPoolExecutor) -> None:
+        error = future.exception() if not future.cancelled() else None
+        if isinstance(error, BrokenProcessPool):
+            # A worker died and took every running job of the pool down with it, not only its own
+            self._replace_executor(executor)
+            retries = self.pool_retries.get(job_id, 0)
+            if retries < MAX_POOL_RETRIES:
+                self.pool_retries[job_id] = retries + 1
+                self.store.requeue(job_id)
+                error = None
+        else:
+            self.pool_retries.pop(job_id, None)
+        if error is not None:
+            self.pool_retries.pop(job_id, None)
+            self.store.fail(job_id, f"{type(error).__name__}: {error}")
+        self.slots.release()
+        self.wakeup.set()
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    # Set by make_server
+    store: JobStore = None
+    runner: JobRunner = None
+    video_dir: str = ""
+
+    def _send(self, status: int, body, content_type: str = "application/json") -> None:
+        data = body.encode('utf-8') if isinstance(body, str) else json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send(status, {'error': message})
+
+    def _route(self) -> List[str]:
+        return [part for part in urlparse(self.path).path.split('/') if part]
+
+    def _resolve_video(self, relative_path: str) -> Optional[str]:
+        """
+        Absolute path of a video under the input directory, None if it is outside or not a video
+        """
+        root = os.path.realpath(self.video_dir)
+        path = os.path.realpath(os.path.join(root, relative_path))
+        if os.path.commonpath([root, path]) != root or not path.lower().endswith(VIDEO_EXTENSIONS):
+            return None
+        return path if os.path.isfile(path) else None
+
+    def do_GET(self) -> None:
+        parts = self._route()
+        if parts == ['videos']:
+            videos = sorted(f for f in os.listdir(self.video_dir) if f.lower().endswith(VIDEO_EXTENSIONS))
+            return self._send(200, {'videos': videos})
+        if parts == ['jobs']:
+            return self._send(200, {'jobs': self.store.list()})
+        if len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = self.store.get(parts[1], with_subtitles=len(parts) == 3)
+            if job is None:
+                return self._error(404, "Unknown job")
+            if len(parts) == 2:
+                return self._send(200, job)
+            if job['status'] != 'done':
+                return self._error(409, f"Job is {job['status']}")
+            if parts[2] == 'subtitles':
+                return self._send(200, {'subtitles': job['subtitles']})
+            if parts[2] in WRITERS:
+                buffer = io.StringIO()
+                with WRITERS[parts[2]](buffer) as writer:
+                    for subtitle in CueList(job['subtitles']):
+                        writer.write(subtitle)
+                return self._send(200, buffer.getvalue(), content_type="text/plain")
+        self._error(404, "Not found")
+
+    def do_POST(self) -> None:
+        if self._route() != ['jobs']:
+            return self._error(404, "Not found")
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._error(400, "Body must be JSON")
+        if not isinstance(payload, dict):
+            return self._error(400, "Body must be a JSON object")
+
+        video_path = self._resolve_video(str(payload.get('video', '')))
+        if video_path is None:
+            return self._error(400, f"No video '{payload.get('video')}' under the input directory")
+
+        params = {name: payload.get(name, default) for name, default in JOB_PARAMS.items()}
+        langs = params['lang'] if isinstance(params['lang'], list) else [params['lang']]
+        if not langs or any(lang not in SUPPORTED_LANGUAGES for lang in langs):
+            return self._error(400, f"Unsupported language {params['lang']}")
+        try:
+            params['frame_rate'] = int(params['frame_rate'])
+            params['confidence_threshold'] = float(params['confidence_threshold'])
+            params['subtitle_disappear_threshold'] = int(params['subtitle_disappear_threshold'])
+        except (TypeError, ValueError):
+            return self._error(400, "Invalid extraction settings")
+
+        job = self.store.submit(video_path, params)
+        self.runner.notify()
+        self._send(202, job)
+
+    def do_DELETE(self) -> None:
+        parts = self._route()
+        if len(parts) != 2 or parts[0] != 'jobs':
+            return self._error(404, "Not found")
+        if self.store.get(parts[1]) is None:
+            return self._error(404, "Unknown job")
+        if not self.store.cancel(parts[1]):
+            return self._error(409, "Only queued jobs can be cancelled")
+        self._send(200, self.store.get(parts[1]))
+
+def make_server(host: str, port: int, store: JobStore, runner: JobRunner, video_dir: str) -> ThreadingHTTPServer:
+    handler = type("BoundServiceHandler", (ServiceHandler,),
+                   {'store': store, 'runner': runner, 'video_dir': video_dir})
+    return ThreadingHTTPServer((host, port), handler)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m service", description="Subtitle extraction job service")
+    parser.add_argument('--host', default=os.environ.get('SUBTITLE_SERVICE_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('SUBTITLE_SERVICE_PORT', 8765)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('SUBTITLE_SERVICE_WORKERS', 1)),
+                        help="Number of extractions running at once, each worker keeps its own models")
+    parser.add_argument('--video-dir', default=os.environ.get('VIDEO_INPUT_DIR', 'C:/video'))
+    parser.add_argument('--state-dir', default=os.environ.get(
+        'SUBTITLE_SERVICE_STATE', os.path.join(os.path.expanduser('~'), '.cache', 'subtitle-service')
+    ), help="Directory of the job database and checkpoints")
+    parser.add_argument('--gpu', action='store_true', help="Run OCR on the GPU")
+    parser.add_argument('--warm-lang', default='en', choices=list(SUPPORTED_LANGUAGES),
+                        help="Language whose models the workers load at startup")
+    args = parser.parse_args()
+
+    os.makedirs(args.state_dir, exist_ok=True)
+    store = JobStore(os.path.join(args.state_dir, 'jobs.sqlite3'))
+    runner = JobRunner(store, args.state_dir, workers=args.workers, use_gpu=args.gpu, warm_lang=args.warm_lang)
+    runner.start()
+
+    server = make_server(args.host, args.port, store, runner, args.video_dir)
+    print(f"Serving on http://{args.host}:{args.port} with {runner.workers} worker(s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        runner.stop()
+
+if __name__ == '__main__':
+    main()
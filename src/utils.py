@@ -1,6 +1,6 @@
 import paddleocr.tools.infer.utility as utility
 import numpy as np
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 import os
 import paddle
 
@@ -12,6 +12,9 @@ SUPPORTED_LANGUAGES: Dict[str, str] = {
     'ar': 'Arabic',
 }
 
+# Video formats the apps and the CLI pick up
+VIDEO_EXTENSIONS: Tuple[str, ...] = ('.mp4', '.avi', '.mov')
+
 def check_gpu_availability() -> bool:
     """Check if GPU is available for PaddlePaddle"""
     try:
@@ -51,7 +54,8 @@ def get_language_paths(lang: str) -> Tuple[str, str]:
     return model_dir, dict_path
 
 def init_args(lang: str = "en", use_gpu: bool = False):
-    args = utility.parse_args()
+    # Defaults only, the command line belongs to the app (CLI, service, spawned workers)
+    args = utility.init_args().parse_args([])
     args.use_gpu = use_gpu # Use this base on your environment
     args.warmup = True
 
@@ -59,40 +63,162 @@ def init_args(lang: str = "en", use_gpu: bool = False):
     args.det_model_dir = "weights/det"
     args.rec_model_dir = model_dir
     args.rec_char_dict_path = dict_path
+    args.subtitle_roi = get_subtitle_roi()  # Crop frames to the subtitle band before detection
     return args
 
+def get_subtitle_roi(vertical_ratio: float = 0.6,
+                     max_height_ratio: float = 0.15,
+                     margin_ratio: float = 0.025) -> Tuple[float, float, float, float]:
+    """
+    Get the default subtitle band as (top, bottom, left, right) ratios of the frame
+
+    The band covers every box `filter_center_bottom_bboxes` can keep with the same
+    ratios: a box centered below `vertical_ratio` and less than `max_height_ratio`
+    tall starts below `vertical_ratio - max_height_ratio / 2`. `margin_ratio` leaves
+    the detector some context above that line.
+    """
+    top = max(0.0, vertical_ratio - max_height_ratio / 2 - margin_ratio)
+    return (top, 1.0, 0.0, 1.0)
+
+def roi_to_pixels(roi, img_height: int, img_width: int) -> Tuple[int, int, int, int]:
+    """
+    Convert (top, bottom, left, right) ratios to a clamped pixel window
+
+    Returns:
+        Tuple of (top, bottom, left, right) in pixels, the full frame if `roi` is None
+    """
+    if roi is None:
+        return 0, img_height, 0, img_width
+
+    top, bottom, left, right = roi
+    top = min(max(int(top * img_height), 0), img_height - 1)
+    bottom = min(max(int(round(bottom * img_height)), top + 1), img_height)
+    left = min(max(int(left * img_width), 0), img_width - 1)
+    right = min(max(int(round(right * img_width)), left + 1), img_width)
+    return top, bottom, left, right
+
+def _box_geometry(dt_boxes) -> Dict[str, np.ndarray]:
+    """
+    Per-box extents and centers of detector boxes, as arrays over the boxes
+    """
+    try:
+        boxes = np.asarray(dt_boxes, dtype=np.float32)
+    except ValueError:
+        boxes = None
+    if boxes is not None and boxes.ndim == 3:
+        xs, ys = boxes[:, :, 0], boxes[:, :, 1]
+        return {
+            'min_x': xs.min(axis=1), 'max_x': xs.max(axis=1),
+            'min_y': ys.min(axis=1), 'max_y': ys.max(axis=1),
+            'mean_x': xs.mean(axis=1), 'mean_y': ys.mean(axis=1),
+            'first_y': ys[:, 0],
+        }
+
+    # Polygons with different numbers of points
+    geometry = {key: [] for key in ('min_x', 'max_x', 'min_y', 'max_y', 'mean_x', 'mean_y', 'first_y')}
+    for box in dt_boxes:
+        box = np.asarray(box, dtype=np.float32)
+        xs, ys = box[:, 0], box[:, 1]
+        for key, value in (('min_x', xs.min()), ('max_x', xs.max()), ('min_y', ys.min()),
+                           ('max_y', ys.max()), ('mean_x', xs.mean()), ('mean_y', ys.mean()),
+                           ('first_y', ys[0])):
+            geometry[key].append(value)
+    return {key: np.asarray(values, dtype=np.float32) for key, values in geometry.items()}
+
+def select_subtitle_boxes(dt_boxes, img_height, img_width,
+                          vertical_ratio=0.6,
+                          horizontal_ratio=0.8,
+                          min_width_ratio=0.1,
+                          max_height_ratio=0.15,
+                          max_vertical_ratio=1.0) -> np.ndarray:
+    """
+    Filter and order subtitle boxes in one vectorized pass over the detector output
+
+    Applies the filter of filter_center_bottom_bboxes and orders the kept boxes
+    by their first point, then center row, then center column: the order that
+    sorted_boxes followed by a stable sort on the first point gives.
+
+    Args:
+        dt_boxes: Detector boxes, an (N, 4, 2) array or a list of point arrays
+        img_height: Frame height in pixels
+        img_width: Frame width in pixels
+
+    Returns:
+        Indices into dt_boxes of the kept boxes, in reading order
+    """
+    if dt_boxes is None or len(dt_boxes) == 0:
+        return np.empty(0, dtype=np.intp)
+
+    g = _box_geometry(dt_boxes)
+    box_height = g['max_y'] - g['min_y']
+    box_width = g['max_x'] - g['min_x']
+    keep = (
+        (g['mean_y'] > img_height * vertical_ratio) & (g['mean_y'] <= img_height * max_vertical_ratio)
+        & (box_width < img_width * horizontal_ratio) & (box_width > img_width * min_width_ratio)
+        & (box_height < img_height * max_height_ratio)
+    )
+    indices = np.flatnonzero(keep)
+    # lexsort is stable and sorts by its last key first
+    order = np.lexsort((g['mean_x'][indices], g['mean_y'][indices], g['first_y'][indices]))
+    return indices[order]
+
+def box_rows(dt_boxes, min_overlap: float = 0.5) -> List[List[int]]:
+    """
+    Group boxes into rows of text by vertical overlap
+
+    The detector may split one subtitle line into several boxes, so lines are
+    the rows these boxes form rather than the boxes themselves.
+
+    Args:
+        dt_boxes: Boxes in reading order, see select_subtitle_boxes
+        min_overlap: Minimum vertical overlap, as a fraction of the smaller box height,
+            for a box to join the row above
+
+    Returns:
+        Lists of box indices, one per row from top to bottom, each ordered left to right
+    """
+    if dt_boxes is None or len(dt_boxes) == 0:
+        return []
+    g = _box_geometry(dt_boxes)
+    rows = []
+    row_top = row_bottom = None
+    for i, (top, bottom) in enumerate(zip(g['min_y'], g['max_y'])):
+        if rows:
+            overlap = min(bottom, row_bottom) - max(top, row_top)
+            if overlap >= min_overlap * min(bottom - top, row_bottom - row_top):
+                rows[-1].append(i)
+                row_top, row_bottom = min(top, row_top), max(bottom, row_bottom)
+                continue
+        rows.append([i])
+        row_top, row_bottom = top, bottom
+    return [sorted(row, key=lambda i: g['min_x'][i]) for row in rows]
+
 def sorted_boxes(dt_boxes):
     """
     Sort detected text boxes from top to bottom, left to right
     """
-    sorted_boxes = sorted(dt_boxes, key=lambda x: (
-        np.mean(x[:, 1]),  # Sort by vertical position
-        np.mean(x[:, 0])   # Then by horizontal position
-    ))
-    return sorted_boxes
+    if dt_boxes is None or len(dt_boxes) == 0:
+        return []
+    g = _box_geometry(dt_boxes)
+    return [dt_boxes[i] for i in np.lexsort((g['mean_x'], g['mean_y']))]
 
 def filter_center_bottom_bboxes(dt_boxes, img_height, img_width,
                               vertical_ratio=0.6,
                               horizontal_ratio=0.8,
                               min_width_ratio=0.1,
-                              max_height_ratio=0.15):
+                              max_height_ratio=0.15,
+                              max_vertical_ratio=1.0):
     """
     Enhanced filter for subtitle bounding boxes
+
+    Keeps boxes whose center lies between `vertical_ratio` and `max_vertical_ratio`
+    of the frame height, with a plausible subtitle line width and height.
+    Boxes keep their input order, see select_subtitle_boxes to filter and sort at once.
     """
-    filtered_boxes = []
-    for box in dt_boxes:
-        # Box dimensions
-        box_height = max(box[:, 1]) - min(box[:, 1])
-        box_width = max(box[:, 0]) - min(box[:, 0])
-        box_center_y = np.mean(box[:, 1])
-        
-        # Filter conditions
-        vertical_condition = box_center_y > (img_height * vertical_ratio)
-        width_condition = (box_width < img_width * horizontal_ratio and 
-                         box_width > img_width * min_width_ratio)
-        height_condition = box_height < img_height * max_height_ratio
-        
-        if vertical_condition and width_condition and height_condition:
-            filtered_boxes.append(box)
-    
-    return filtered_boxes
\ No newline at end of file
+    indices = select_subtitle_boxes(dt_boxes, img_height, img_width,
+                                    vertical_ratio=vertical_ratio,
+                                    horizontal_ratio=horizontal_ratio,
+                                    min_width_ratio=min_width_ratio,
+                                    max_height_ratio=max_height_ratio,
+                                    max_vertical_ratio=max_vertical_ratio)
+    return [dt_boxes[i] for i in np.sort(indices)]